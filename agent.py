@@ -2,10 +2,46 @@
 Simplified Chat Agent using Google Generative AI directly
 No LangChain/LangGraph dependencies for Vercel deployment
 """
+import asyncio
+import contextvars
+import re
+import time
 import google.generativeai as genai
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from typing import List, Dict, Optional
 from config import settings
-from profile_data import ANSHUL_PROFILE, SYSTEM_PROMPT
+from deadline import Deadline, DeadlineExceeded, LatencyTracker
+from fair_share import FairQueue, FairSlot
+from profiler import profiled_thread
+from tenants import TenantContext, default_tenant
+
+# Keyword routing; a query matching several intents goes to the one with the largest
+# token budget (ties to the earlier entry), anything unmatched is "general"
+INTENT_KEYWORDS = [
+    ("contact", ["contact", "email", "phone", "reach", "linkedin", "github"]),
+    ("projects", ["project", "rag", "rockfall", "chatbot", "portfolio"]),
+    ("skills", ["skill", "technology", "tech stack", "tools"]),
+    ("education", ["education", "degree", "college", "university"]),
+    ("experience", ["experience", "work", "job", "position"]),
+    ("achievements", ["achievement", "award", "accomplishment"]),
+]
+
+def _response_text(response) -> Optional[str]:
+    """
+    The reply text, or None if generation stopped at max_output_tokens before any text
+    Thinking tokens count against max_output_tokens, and response.text raises when
+    the budget ran out while the model was still thinking
+    """
+    try:
+        return response.text
+    except ValueError:
+        candidates = getattr(response, "candidates", None) or []
+        reason = getattr(candidates[0].finish_reason, "name", None) if candidates else None
+        if reason == "MAX_TOKENS":
+            return None
+        raise
+
 
 class AnshulChatAgent:
     """
@@ -15,7 +51,40 @@ class AnshulChatAgent:
     - No heavy dependencies
     """
     
-    def __init__(self):
+    def __init__(self, model=None):
+        """
+        Args:
+            model: Optional pre-built model (e.g. a fake for replay and benchmarks);
+                   skips API key validation and Gemini configuration
+        """
+        # Initialize model with generation config
+        self.generation_config = {
+            "temperature": settings.GEMINI_TEMPERATURE,
+            "max_output_tokens": settings.GEMINI_MAX_OUTPUT_TOKENS,
+        }
+        
+        # Deadline handling: upstream calls run on a pool so they can be timed out and hedged
+        self.executor = ThreadPoolExecutor(max_workers=settings.LLM_MAX_WORKERS, thread_name_prefix="llm")
+        self.latency = LatencyTracker()
+        self.answer_cache: OrderedDict = OrderedDict()
+        self.deadline_reserve = settings.DEADLINE_RESERVE_SECONDS
+        self.min_model_seconds = settings.DEADLINE_MIN_MODEL_SECONDS
+        self.hedge_enabled = settings.HEDGE_ENABLED
+        self.hedge_percentile = settings.HEDGE_PERCENTILE
+        self.adaptive_generation = settings.ADAPTIVE_GENERATION
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.degraded = 0
+        self.budget_retries = 0
+        
+        # Fair share: concurrent clients take turns for the upstream model; every upstream
+        # call (hedges and calls abandoned past a deadline included) holds a slot
+        self.fair_queue = FairQueue(settings.FAIR_QUEUE_CONCURRENCY) if settings.FAIR_QUEUE_ENABLED else None
+        
+        if model is not None:
+            self.model = model
+            return
+        
         # Validate API key before configuring
         if not settings.is_configured():
             raise ValueError(
@@ -26,75 +95,49 @@ class AnshulChatAgent:
         # Configure Gemini
         genai.configure(api_key=settings.GOOGLE_API_KEY)
         
-        # Initialize model with generation config
-        self.generation_config = {
-            "temperature": settings.GEMINI_TEMPERATURE,
-            "max_output_tokens": settings.GEMINI_MAX_OUTPUT_TOKENS,
-        }
-        
         self.model = genai.GenerativeModel(
             model_name=settings.GEMINI_MODEL,
             generation_config=self.generation_config,
         )
     
-    def get_profile_context(self, query: str) -> str:
+    def classify_intent(self, query: str) -> str:
         """
-        Quick lookup of relevant profile information
-        Optimized for common queries
+        Route a query to a profile section by keyword, falling back to general
+        "his GitHub projects" matches contact and projects; the larger budget wins so
+        a broad question is never cut down to a lookup-sized answer
         """
         query_lower = query.lower()
-        
-        # Contact information
-        if any(word in query_lower for word in ["contact", "email", "phone", "reach", "linkedin", "github"]):
-            return f"""
-Contact Information:
-- Email: {ANSHUL_PROFILE.contact.email}
-- Phone: {ANSHUL_PROFILE.contact.phone}
-- Portfolio: {ANSHUL_PROFILE.contact.portfolio}
-- GitHub: {ANSHUL_PROFILE.contact.github}
-- LinkedIn: {ANSHUL_PROFILE.contact.linkedin}
-"""
-        
-        # Projects
-        if any(word in query_lower for word in ["project", "rag", "rockfall", "chatbot", "portfolio"]):
-            projects_info = "\n\n".join([
-                f"**{p.name}**\n{p.description}\n"
-                f"Demo: {p.demo_video}\nGitHub: {p.github}\nWebsite: {p.website}"
-                for p in ANSHUL_PROFILE.projects
-            ])
-            return f"Projects:\n{projects_info}"
-        
-        # Skills
-        if any(word in query_lower for word in ["skill", "technology", "tech stack", "tools"]):
-            skills_info = "\n".join([
-                f"**{category}:** {', '.join(skills)}"
-                for category, skills in ANSHUL_PROFILE.technical_skills.items()
-            ])
-            return f"Technical Skills:\n{skills_info}"
-        
-        # Education
-        if any(word in query_lower for word in ["education", "degree", "college", "university"]):
-            edu_info = "\n".join([
-                f"- {e.degree} at {e.institution} ({e.score}) | {e.period}"
-                for e in ANSHUL_PROFILE.education
-            ])
-            return f"Education:\n{edu_info}"
-        
-        # Experience
-        if any(word in query_lower for word in ["experience", "work", "job", "position"]):
-            exp_info = "\n".join([
-                f"**{e.title}** at {e.organization} ({e.period})\n" +
-                "\n".join([f"  • {r}" for r in e.responsibilities])
-                for e in ANSHUL_PROFILE.experience
-            ])
-            return f"Experience:\n{exp_info}"
-        
-        # Achievements
-        if any(word in query_lower for word in ["achievement", "award", "accomplishment"]):
-            ach_info = "\n".join([f"• {a}" for a in ANSHUL_PROFILE.achievements])
-            return f"Achievements:\n{ach_info}"
-        
-        return ""
+        matches = [intent for intent, keywords in INTENT_KEYWORDS if any(word in query_lower for word in keywords)]
+        if not matches:
+            return "general"
+        budgets = settings.GENERATION_PROFILES
+        return max(matches, key=lambda intent: budgets.get(intent, budgets["general"])["max_output_tokens"])
+    
+    def generation_profile(self, intent: str) -> Dict:
+        """
+        Per-intent generation config and brevity instruction
+        Output length dominates latency, so short lookups get a small token budget;
+        GEMINI_MAX_OUTPUT_TOKENS stays the ceiling for every intent
+        """
+        if not self.adaptive_generation:
+            return {"generation_config": dict(self.generation_config), "brevity": ""}
+        profile = settings.GENERATION_PROFILES.get(intent) or settings.GENERATION_PROFILES["general"]
+        return {
+            "generation_config": {
+                "temperature": profile["temperature"],
+                "max_output_tokens": min(profile["max_output_tokens"], settings.GEMINI_MAX_OUTPUT_TOKENS),
+            },
+            "brevity": profile["brevity"],
+        }
+    
+    def get_profile_context(self, query: str, intent: Optional[str] = None,
+                            tenant: Optional[TenantContext] = None) -> str:
+        """
+        Quick lookup of relevant profile information
+        Sections are pre-rendered per tenant, so this is a dict lookup
+        """
+        tenant = tenant or default_tenant()
+        return tenant.get_context(intent or self.classify_intent(query))
     
     def format_history(self, messages: List[Dict]) -> List[Dict]:
         """
@@ -116,28 +159,209 @@ Contact Information:
         
         return formatted
     
-    def chat(self, message: str, session_messages: Optional[List[Dict]] = None) -> tuple[str, List[Dict]]:
+    def _cache_key(self, message: str, tenant: TenantContext) -> Optional[str]:
+        """
+        Key shared by all sessions, so only for messages routed to a profile section;
+        "general" ones ("yes", "tell me more") mean something different in every conversation
+        """
+        if self.classify_intent(message) == "general":
+            return None
+        return f"{tenant.tenant_id}:" + re.sub(r"\s+", " ", message.strip().lower())
+    
+    def remember_answer(self, message: str, answer: str, tenant: Optional[TenantContext] = None):
+        """Keep recent answers to profile questions around for degraded responses"""
+        key = self._cache_key(message, tenant or default_tenant())
+        if key is None:
+            return
+        self.answer_cache[key] = answer
+        self.answer_cache.move_to_end(key)
+        while len(self.answer_cache) > settings.ANSWER_CACHE_SIZE:
+            self.answer_cache.popitem(last=False)
+    
+    def fallback_answer(self, message: str, tenant: Optional[TenantContext] = None) -> str:
+        """
+        Answer without the LLM when the deadline is too close
+        Order: cached answer to the same question, profile fast path, contact details
+        """
+        tenant = tenant or default_tenant()
+        key = self._cache_key(message, tenant)
+        cached = self.answer_cache.get(key) if key is not None else None
+        if cached:
+            return cached
+        
+        contact = tenant.profile.contact
+        first_name = contact.name.split()[0]
+        context = self.get_profile_context(message, tenant=tenant)
+        if context:
+            return f"Here is the relevant information from {first_name}'s profile:\n{context.strip()}"
+        
+        return (
+            f"I couldn't put together a full answer in time. {contact.name} is a {contact.role}. "
+            f"You can reach {first_name} at {contact.email} or see more at {contact.portfolio}"
+        )
+    
+    @profiled_thread
+    def _send(self, history: List[Dict], prompt: str, timeout: Optional[float],
+              generation_config: Optional[Dict] = None) -> str:
+        """One upstream call on a fresh chat session (hedges must not share history)"""
+        start = time.monotonic()
+        chat = self.model.start_chat(history=history)
+        kwargs = {}
+        if generation_config:
+            kwargs["generation_config"] = generation_config
+        if timeout is not None:
+            kwargs["request_options"] = {"timeout": timeout}
+        response = chat.send_message(prompt, **kwargs)
+        text = _response_text(response)
+        if text is None and generation_config and \
+                generation_config.get("max_output_tokens", 0) < settings.GEMINI_MAX_OUTPUT_TOKENS:
+            # Thinking used up a small per-intent budget; ask again with the full one
+            self.budget_retries += 1
+            kwargs["generation_config"] = {**generation_config, "max_output_tokens": settings.GEMINI_MAX_OUTPUT_TOKENS}
+            response = self.model.start_chat(history=history).send_message(prompt, **kwargs)
+            text = _response_text(response)
+        if text is None:
+            raise ValueError("The model used its whole output budget without producing an answer")
+        self.latency.record(time.monotonic() - start)
+        return text
+    
+    def _submit(self, slot: Optional[FairSlot], history: List[Dict], prompt: str, timeout: Optional[float],
+                generation_config: Optional[Dict]):
+        """Run _send on the pool with the caller's context, keeping slot until it finishes"""
+        future = self.executor.submit(contextvars.copy_context().run, self._send, history, prompt, timeout,
+                                      generation_config)
+        if slot is not None:
+            slot.attach(future)
+        return future
+    
+    def generate(self, history: List[Dict], prompt: str, deadline: Optional[Deadline] = None,
+                 generation_config: Optional[Dict] = None, slot: Optional[FairSlot] = None) -> str:
+        """
+        Call the model within the deadline, hedging once the call outlives the observed p95
+        With a fair-queue slot, hedges only go out if a spare slot is free
+        
+        Raises:
+            DeadlineExceeded: with a fallback answer if no call finished in time
+        """
+        if deadline is None and not self.hedge_enabled:
+            return self._send(history, prompt, None, generation_config)
+        
+        budget = None if deadline is None else deadline.remaining() - self.deadline_reserve
+        if budget is not None and budget < self.min_model_seconds:
+            raise DeadlineExceeded()
+        start = time.monotonic()
+        
+        def time_left() -> Optional[float]:
+            return None if budget is None else max(0.0, budget - (time.monotonic() - start))
+        
+        primary = self._submit(slot, history, prompt, budget, generation_config)
+        pending = {primary}
+        
+        hedge_after = self.latency.quantile(self.hedge_percentile) if self.hedge_enabled else None
+        if hedge_after is not None and (budget is None or hedge_after < budget):
+            done, _ = wait(pending, timeout=hedge_after)
+            hedge_slot = None
+            if not done and slot is not None:
+                hedge_slot = slot.queue.try_acquire(slot.client, slot.weight)
+            if not done and (slot is None or hedge_slot is not None):
+                pending.add(self._submit(hedge_slot, history, prompt, time_left(), generation_config))
+                self.hedges_sent += 1
+                if hedge_slot is not None:
+                    hedge_slot.done()  # Now held by the hedge's future alone
+        
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=time_left(), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    # The loser is abandoned; its own request timeout ends the upstream call
+                    for loser in pending:
+                        loser.cancel()
+                    if future is not primary:
+                        self.hedges_won += 1
+                    return future.result()
+                error = future.exception()
+        
+        for future in pending:
+            future.cancel()
+        if error is not None and not pending:
+            raise error
+        raise DeadlineExceeded()
+    
+    def queue_timeout(self, deadline: Optional[Deadline]) -> Optional[float]:
+        """How long a request may wait for a fair-queue slot and still leave the model enough time"""
+        if deadline is None:
+            return None
+        return deadline.remaining() - self.deadline_reserve - self.min_model_seconds
+    
+    def generate_fairly(self, client: Optional[str], history: List[Dict], prompt: str,
+                        deadline: Optional[Deadline] = None, generation_config: Optional[Dict] = None,
+                        slot: Optional[FairSlot] = None) -> str:
+        """
+        generate() once the fair queue grants this client a slot (or with one the caller holds)
+        
+        Raises:
+            DeadlineExceeded: if no slot frees up while the model could still finish in time
+        """
+        if self.fair_queue is None:
+            return self.generate(history, prompt, deadline, generation_config)
+        if slot is not None:
+            return self.generate(history, prompt, deadline, generation_config, slot)
+        slot = self.fair_queue.acquire(client or "", timeout=self.queue_timeout(deadline))
+        if slot is None:
+            raise DeadlineExceeded()
+        try:
+            return self.generate(history, prompt, deadline, generation_config, slot)
+        finally:
+            slot.done()
+    
+    @profiled_thread
+    def chat(
+        self,
+        message: str,
+        session_messages: Optional[List[Dict]] = None,
+        deadline: Optional[Deadline] = None,
+        tenant: Optional[TenantContext] = None,
+        client: Optional[str] = None,
+        slot: Optional[FairSlot] = None,
+    ) -> tuple[str, List[Dict]]:
         """
         Process a chat message with fast response
         
         Args:
             message: User's input message
             session_messages: Previous messages in session (auto-trimmed to 10)
+            deadline: When the answer is due; the model call is cut short to meet it
+            tenant: Whose profile to answer about (default: the built-in profile)
+            client: Fair-queue key (IP or session); calls without one share a single queue
+            slot: Fair-queue slot already granted to this call (see chat_async)
         
         Returns:
             Tuple of (AI response string, updated messages list)
+        
+        Raises:
+            DeadlineExceeded: carrying a fallback answer; the session is left unchanged
         """
+        tenant = tenant or default_tenant()
+        system_prompt = tenant.system_prompt
+        
         # Initialize messages
         if session_messages is None or len(session_messages) == 0:
-            messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+            messages = [{"role": "system", "content": system_prompt}]
         else:
             messages = session_messages.copy()
             # Ensure system message is first
             if not messages or messages[0].get("role") != "system":
-                messages.insert(0, {"role": "system", "content": SYSTEM_PROMPT})
+                messages.insert(0, {"role": "system", "content": system_prompt})
+        
+        # Route once: the intent picks both the profile context and the generation limits
+        intent = self.classify_intent(message)
+        profile = self.generation_profile(intent)
         
         # Add context if relevant
-        context = self.get_profile_context(message)
+        context = self.get_profile_context(message, intent, tenant)
         if context:
             enhanced_message = f"{message}\n\nRelevant Information:\n{context}"
         else:
@@ -151,42 +375,65 @@ Contact Information:
         # Format history for Gemini
         history = self.format_history(messages[1:])  # Exclude system message from history
         
-        # Start chat with system prompt and history
-        chat = self.model.start_chat(history=history)
-        
-        # Send message with system context
-        full_prompt = f"{SYSTEM_PROMPT}\n\nUser: {enhanced_message}"
-        response = chat.send_message(full_prompt)
+        # Send message with system context, degrading if the deadline is too close
+        full_prompt = f"{system_prompt}\n\nUser: {enhanced_message}"
+        if profile["brevity"]:
+            full_prompt = f"{system_prompt}\n\n{profile['brevity']}\n\nUser: {enhanced_message}"
+        try:
+            response_text = self.generate_fairly(client, history, full_prompt, deadline, profile["generation_config"],
+                                                 slot)
+        except DeadlineExceeded:
+            self.degraded += 1
+            raise DeadlineExceeded(self.fallback_answer(message, tenant)) from None
+        self.remember_answer(message, response_text, tenant)
         
         # Add new messages to history
         messages.append({"role": "user", "content": message})
-        messages.append({"role": "assistant", "content": response.text})
+        messages.append({"role": "assistant", "content": response_text})
         
         # Trim again after adding new messages
         if len(messages) > settings.MAX_CONVERSATION_HISTORY + 1:
             system_msg = messages[0]
             messages = [system_msg] + messages[-(settings.MAX_CONVERSATION_HISTORY):]
         
-        return response.text, messages
+        return response_text, messages
     
-    def get_quick_info(self, info_type: str) -> Optional[Dict]:
+    async def chat_async(
+        self,
+        message: str,
+        session_messages: Optional[List[Dict]] = None,
+        deadline: Optional[Deadline] = None,
+        tenant: Optional[TenantContext] = None,
+        client: Optional[str] = None,
+    ) -> tuple[str, List[Dict]]:
+        """
+        chat() for the event loop: the fair-queue wait happens here, so only admitted
+        requests occupy a worker thread
+        
+        Raises:
+            DeadlineExceeded: carrying a fallback answer; the session is left unchanged
+        """
+        slot = None
+        if self.fair_queue is not None:
+            slot = await self.fair_queue.acquire_async(client or "", timeout=self.queue_timeout(deadline))
+            if slot is None:
+                self.degraded += 1
+                raise DeadlineExceeded(self.fallback_answer(message, tenant))
+        try:
+            return await asyncio.to_thread(self.chat, message, session_messages, deadline, tenant, client, slot)
+        finally:
+            if slot is not None:
+                slot.done()
+    
+    def get_quick_info(self, info_type: str, tenant: Optional[TenantContext] = None) -> Optional[Dict]:
         """
         Get specific information quickly without LLM
         
         Args:
             info_type: One of ['contact', 'projects', 'skills', 'education', 'experience', 'achievements', 'summary']
+            tenant: Whose profile to read (default: the built-in profile)
         
         Returns:
             Dictionary with requested information
         """
-        info_map = {
-            "contact": ANSHUL_PROFILE.contact.dict(),
-            "projects": [p.dict() for p in ANSHUL_PROFILE.projects],
-            "skills": ANSHUL_PROFILE.technical_skills,
-            "education": [e.dict() for e in ANSHUL_PROFILE.education],
-            "experience": [e.dict() for e in ANSHUL_PROFILE.experience],
-            "achievements": ANSHUL_PROFILE.achievements,
-            "summary": ANSHUL_PROFILE.summary
-        }
-        
-        return info_map.get(info_type)
+        return (tenant or default_tenant()).get_quick_info(info_type)
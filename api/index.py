@@ -1,4 +1,4 @@
-from main import app
+from main import asgi_app
 from mangum import Mangum
 
-handler = Mangum(app)
+handler = Mangum(asgi_app)
@@ -0,0 +1,72 @@
+"""
+Benchmark: bytes on the wire versus CPU per response for each compression choice
+- /profile: pre-compressed once (fast lane) vs compressed per request at the same level
+- chat-sized JSON bodies: fixed gzip/brotli levels vs the adaptive level picker
+Run: python bench_compression.py
+"""
+import asyncio
+import time
+
+import main
+from compression import ENCODINGS, AdaptiveCompressor, StaticBody, compress
+from fast_lane import render_json
+from profile_data import ANSHUL_PROFILE
+from tenants import default_tenant
+
+ROUNDS = 200
+FIXED_LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 9, 11)}
+
+
+def chat_body(size: int) -> bytes:
+    """A /chat ChatResponse whose reply is roughly size bytes of profile-flavoured prose"""
+    words = (ANSHUL_PROFILE.summary + " " + " ".join(ANSHUL_PROFILE.achievements)).split()
+    reply, i = [], 0
+    while sum(len(w) + 1 for w in reply) < size:
+        reply.append(words[i % len(words)])
+        i += 1
+    return render_json(main.ChatResponse(response=" ".join(reply), message_count=4))
+
+
+def cpu_us(fn) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return (time.perf_counter() - start) / ROUNDS * 1e6
+
+
+def row(label, raw, packed, us):
+    print(f"{label:<28}{len(packed):>10,}{len(packed) / len(raw):>9.0%}{us:>12,.1f}")
+
+
+if __name__ == "__main__":
+    print("🗜️  Compression benchmark")
+    print(f"   encodings available: {', '.join(ENCODINGS)}; CPU is the mean of {ROUNDS} runs\n")
+    header = f"{'body / method':<28}{'bytes':>10}{'ratio':>9}{'CPU µs':>12}"
+
+    profile = render_json(asyncio.run(main.get_full_profile(tenant=default_tenant())))
+    static = StaticBody(profile)
+    print(f"/profile ({len(profile):,} bytes identity)")
+    print(header)
+    row("identity", profile, profile, 0.0)
+    for encoding in ENCODINGS:
+        level = 11 if encoding == "br" else 9
+        row(f"{encoding}-{level} per request", profile, static.variants[encoding],
+            cpu_us(lambda: compress(profile, encoding, level)))
+        row(f"{encoding}-{level} pre-compressed", profile, static.variants[encoding],
+            cpu_us(lambda: static.select(encoding.encode())))
+
+    for size in (1_024, 8_192, 32_768):
+        body = chat_body(size)
+        print(f"\n/chat reply (~{size // 1024} KB, {len(body):,} bytes identity)")
+        print(header)
+        for encoding in ENCODINGS:
+            for level in FIXED_LEVELS[encoding]:
+                row(f"{encoding}-{level}", body, compress(body, encoding, level),
+                    cpu_us(lambda: compress(body, encoding, level)))
+            compressor = AdaptiveCompressor()
+            for _ in range(20):  # Let the throughput estimates settle
+                compressor.compress(body, encoding)
+            level = compressor.pick_level(encoding, len(body))
+            row(f"{encoding} adaptive (level {level})", body, compress(body, encoding, level),
+                cpu_us(lambda: compressor.compress(body, encoding)))
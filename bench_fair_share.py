@@ -0,0 +1,99 @@
+"""
+Simulation benchmark: /chat tail latency for well-behaved clients beside a noisy neighbor
+Requests go through main.asgi_app (rate limits, fair queue, worker threads) with a fake
+model capped at FAIR_QUEUE_CONCURRENCY calls in flight.
+- Quiet clients each send one message, wait for the answer, then think for a while
+- The noisy client keeps NOISY_CONCURRENCY requests in flight and ignores Retry-After;
+  the larger setting exceeds Starlette's 40 worker threads
+Run: python bench_fair_share.py
+"""
+import asyncio
+import json
+import time
+
+import main
+from agent import AnshulChatAgent
+from fair_share import FairQueue
+from fake_model import FakeGenerativeModel, lognormal_latency
+from replay import asgi_request, percentile
+
+DURATION_SECONDS = 4.0
+CONCURRENCY = 4
+MODEL_MEDIAN_SECONDS = 0.05
+QUIET_CLIENTS = 4
+QUIET_THINK_SECONDS = 0.2
+NOISY_CONCURRENCY = (24, 80)
+LIMIT_PER_MINUTE = 600  # Comfortably above what a quiet client sends
+
+
+class FifoQueue(FairQueue):
+    """Same capacity with every caller in one queue: first come, first served"""
+
+    def _tag(self, client, weight):
+        return super()._tag("", weight)
+
+
+async def post_chat(ip: str, session_id: str):
+    body = json.dumps({"message": "Tell me about his projects", "session_id": session_id}).encode()
+    start = time.perf_counter()
+    status, _, _ = await asgi_request(main.asgi_app, "POST", "/chat", body=body,
+                                      headers=[(b"x-forwarded-for", ip.encode())])
+    return status, time.perf_counter() - start
+
+
+async def quiet_client(n: int, stop: float, latencies: list):
+    while time.perf_counter() < stop:
+        status, elapsed = await post_chat(f"198.51.100.{n}", f"quiet-{n}")
+        if status == 200:
+            latencies.append(elapsed)
+        await asyncio.sleep(QUIET_THINK_SECONDS)
+
+
+async def noisy_worker(n: int, stop: float, counts: dict):
+    while time.perf_counter() < stop:
+        status, _ = await post_chat("203.0.113.66", f"noisy-{n}")
+        counts[status] = counts.get(status, 0) + 1
+        if status == 429:
+            await asyncio.sleep(0.01)
+
+
+async def simulate(noisy: int):
+    stop = time.perf_counter() + DURATION_SECONDS
+    latencies, counts = [], {}
+    tasks = [quiet_client(n, stop, latencies) for n in range(QUIET_CLIENTS)]
+    tasks += [noisy_worker(n, stop, counts) for n in range(noisy)]
+    await asyncio.gather(*tasks)
+    return sorted(latencies), counts
+
+
+def scenario(queue: FairQueue, rate_limit: bool, noisy: int):
+    agent = AnshulChatAgent(model=FakeGenerativeModel(latency=lognormal_latency(MODEL_MEDIAN_SECONDS, 0.3)))
+    agent.fair_queue = queue
+    main.get_agent = lambda: agent
+    main.settings.RATE_LIMIT_ENABLED = rate_limit
+    main.get_rate_limits.cache_clear()
+    main.sessions.clear()
+    return asyncio.run(simulate(noisy))
+
+
+if __name__ == "__main__":
+    main.settings.TRUST_PROXY_HEADERS = True  # Simulated clients are told apart by X-Forwarded-For
+    main.settings.RATE_LIMIT_IP_PER_MINUTE = LIMIT_PER_MINUTE
+    main.settings.RATE_LIMIT_SESSION_PER_MINUTE = LIMIT_PER_MINUTE
+    scenarios = [("no noisy neighbor (FIFO)", FifoQueue(CONCURRENCY), False, 0)]
+    for noisy in NOISY_CONCURRENCY:
+        scenarios += [
+            (f"{noisy} noisy, FIFO", FifoQueue(CONCURRENCY), False, noisy),
+            (f"{noisy} noisy, fair queue", FairQueue(CONCURRENCY), False, noisy),
+            (f"{noisy} noisy, fair + buckets", FairQueue(CONCURRENCY), True, noisy),
+        ]
+
+    print("⚖️  Fair share benchmark")
+    print(f"   {QUIET_CLIENTS} quiet clients vs a noisy client with many requests in flight, "
+          f"{CONCURRENCY} model calls in flight, {DURATION_SECONDS:.0f}s per scenario\n")
+    print(f"{'scenario':<30}{'quiet n':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'noisy 200':>11}{'noisy 429':>11}")
+    for label, queue, rate_limit, noisy in scenarios:
+        latencies, counts = scenario(queue, rate_limit, noisy)
+        print(f"{label:<30}{len(latencies):>9}"
+              + "".join(f"{percentile(latencies, q) * 1000:>9.0f}" for q in (50, 95, 99))
+              + f"{counts.get(200, 0):>11}{counts.get(429, 0):>11}")
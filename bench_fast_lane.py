@@ -0,0 +1,45 @@
+"""
+Benchmark: requests per second through the ASGI fast lane vs the FastAPI stack
+Requests are driven straight into the ASGI app (no server, no sockets), so the
+numbers isolate framework overhead per request
+Run: python bench_fast_lane.py
+"""
+import asyncio
+import json
+import time
+
+import main
+from agent import AnshulChatAgent
+from fake_model import FakeGenerativeModel
+from replay import asgi_request
+
+REQUESTS = 3_000
+ORIGIN = [(b"origin", b"https://anshul-dev-profolio.vercel.app")]
+
+ROUTES = [
+    ("GET /", "GET", "/", None),
+    ("GET /health", "GET", "/health", None),
+    ("GET /profile", "GET", "/profile", None),
+    ("POST /quick-info", "POST", "/quick-info", json.dumps({"info_type": "projects"}).encode()),
+]
+
+
+async def requests_per_second(app, method, path, body) -> float:
+    await asgi_request(app, method, path, body=body, headers=ORIGIN)  # Warm up caches
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        await asgi_request(app, method, path, body=body, headers=ORIGIN)
+    return REQUESTS / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    agent = AnshulChatAgent(model=FakeGenerativeModel())
+    main.get_agent = lambda: agent
+
+    print("🏎️  ASGI fast lane benchmark")
+    print(f"   {REQUESTS:,} sequential requests per route, with an Origin header\n")
+    print(f"{'route':<20}{'FastAPI req/s':>15}{'fast lane req/s':>17}{'speedup':>10}")
+    for label, method, path, body in ROUTES:
+        slow = asyncio.run(requests_per_second(main.app, method, path, body))
+        fast = asyncio.run(requests_per_second(main.asgi_app, method, path, body))
+        print(f"{label:<20}{slow:>15,.0f}{fast:>17,.0f}{fast / slow:>9.1f}x")
@@ -0,0 +1,65 @@
+"""
+Benchmark: binary session codec vs JSON
+Compares bytes and encode/decode time for a full session (system prompt + 10 messages)
+and for the per-turn write (JSON must rewrite the session, a delta carries the new turn)
+Run: python bench_session_codec.py
+"""
+import json
+import time
+
+from profile_data import SYSTEM_PROMPT
+from session_codec import decode, encode_delta, encode_snapshot, zstandard
+
+ITERATIONS = 5_000
+
+USER = "Can you walk me through the RAG project and the metrics it achieved?"
+ASSISTANT = ("Anshul built a multimodal RAG pipeline over PDFs with LangGraph and Qdrant. "
+             "It reached **94% semantic relevance** and cut inference time by 35% on 1K+ daily queries. "
+             "- Demo: https://youtu.be/example\n- GitHub: https://github.com/AnshulParate2004\n") * 4
+
+
+def session(turns: int):
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"{USER} ({i})"})
+        messages.append({"role": "assistant", "content": ASSISTANT})
+    return messages
+
+
+def per_call_us(fn) -> float:
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+if __name__ == "__main__":
+    print("📦 Session codec benchmark")
+    full = session(5)
+    previous = full[:-2]
+
+    print(f"\nFull session ({len(full)} messages):")
+    print(f"   {'format':<16}{'bytes':>9}{'encode µs':>12}{'decode µs':>12}")
+    raw_json = json.dumps(full).encode()
+    print(f"   {'json':<16}{len(raw_json):>9}"
+          f"{per_call_us(lambda: json.dumps(full).encode()):>12.1f}"
+          f"{per_call_us(lambda: json.loads(raw_json)):>12.1f}")
+    modes = ["none", "zlib"] + (["zstd"] if zstandard is not None else [])
+    for mode in modes:
+        frame = encode_snapshot(full, mode)
+        print(f"   {'binary/' + mode:<16}{len(frame):>9}"
+              f"{per_call_us(lambda: encode_snapshot(full, mode)):>12.1f}"
+              f"{per_call_us(lambda: decode(frame)):>12.1f}")
+
+    print("\nPer-turn write (one user + one assistant message appended):")
+    print(f"   {'format':<16}{'bytes':>9}{'encode µs':>12}{'apply µs':>12}")
+    print(f"   {'json rewrite':<16}{len(raw_json):>9}"
+          f"{per_call_us(lambda: json.dumps(full).encode()):>12.1f}"
+          f"{per_call_us(lambda: json.loads(raw_json)):>12.1f}")
+    for mode in modes:
+        delta = encode_delta(previous, full, mode)
+        print(f"   {'delta/' + mode:<16}{len(delta):>9}"
+              f"{per_call_us(lambda: encode_delta(previous, full, mode)):>12.1f}"
+              f"{per_call_us(lambda: decode(delta, previous)):>12.1f}")
+    if zstandard is None:
+        print("\n   (zstandard not installed; zstd rows skipped)")
@@ -0,0 +1,81 @@
+"""
+Benchmark for lazily loaded, LRU-cached tenant profiles
+Writes 10k tenant files and compares registry cold start, first-use and cached lookups
+against eagerly loading every profile at startup
+Run: python bench_tenants.py
+"""
+import json
+import os
+import random
+import tempfile
+import time
+
+from profile_data import ANSHUL_PROFILE
+from replay import percentile
+from tenants import TenantContext, TenantRegistry, load_profile_file
+
+TENANTS = 10_000
+LOOKUPS = 20_000
+CACHE_BYTES = 4 * 1024 * 1024
+
+
+def write_tenants(directory: str):
+    template = ANSHUL_PROFILE.model_dump(mode="json")
+    for i in range(TENANTS):
+        template["contact"]["name"] = f"Tenant {i:05d}"
+        with open(os.path.join(directory, f"tenant-{i:05d}.json"), "w") as f:
+            json.dump(template, f)
+
+
+def timed_us(fn) -> float:
+    start = time.perf_counter_ns()
+    fn()
+    return (time.perf_counter_ns() - start) / 1000
+
+
+def report(label: str, timings):
+    timings = sorted(timings)
+    print(f"   {label:<22} p50 {percentile(timings, 50):>9.1f} µs   p99 {percentile(timings, 99):>9.1f} µs")
+
+
+if __name__ == "__main__":
+    print(f"🏢 Multi-tenant profile benchmark ({TENANTS:,} tenant files)")
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        write_tenants(directory)
+        print(f"   wrote files in {time.perf_counter() - start:.1f}s\n")
+
+        # Cold start: lazy registry vs loading everything up front
+        start = time.perf_counter()
+        registry = TenantRegistry(directory, max_bytes=CACHE_BYTES)
+        lazy_start_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        eager = {
+            name[:-5]: TenantContext(name[:-5], load_profile_file(os.path.join(directory, name)))
+            for name in os.listdir(directory)
+        }
+        eager_start_ms = (time.perf_counter() - start) * 1000
+        del eager
+
+        print("Cold start:")
+        print(f"   lazy registry          {lazy_start_ms:>10.3f} ms")
+        print(f"   eager load all         {eager_start_ms:>10.1f} ms")
+
+        # Skewed traffic: a few popular tenants, a long tail of rare ones
+        rng = random.Random(0)
+        ids = [f"tenant-{min(int(rng.paretovariate(0.4)) - 1, TENANTS - 1):05d}" for _ in range(LOOKUPS)]
+        first_use, cached = [], []
+        seen = set()
+        for tenant_id in ids:
+            elapsed = timed_us(lambda: registry.get(tenant_id))
+            (cached if tenant_id in seen else first_use).append(elapsed)
+            seen.add(tenant_id)
+
+        print(f"\nLookups ({LOOKUPS:,}, Pareto-skewed, {len(seen):,} distinct tenants):")
+        report("first use (load)", first_use)
+        report("repeat (LRU/reload)", cached)
+        stats = registry.stats()
+        print(f"   cache: {stats['cached']:,} tenants, {stats['cached_bytes'] / 1024 / 1024:.1f} MB "
+              f"of {stats['max_bytes'] / 1024 / 1024:.0f} MB, {stats['evictions']:,} evictions, "
+              f"hit rate {stats['hits'] / (stats['hits'] + stats['misses']):.1%}")
@@ -0,0 +1,198 @@
+"""
+Negotiated response compression (gzip, and brotli when installed)
+- Static bodies are compressed once at the highest level and reused (see fast_lane.py)
+- Dynamic bodies above a size threshold are compressed per response, at the highest
+  level whose measured cost fits a per-response CPU budget
+"""
+import gzip
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+# Preference order when the client accepts several encodings equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+# Candidate levels for dynamic responses, best ratio first, with a rough starting
+# throughput guess (bytes per ms) that is replaced by measurements
+DYNAMIC_LEVELS = {
+    "br": ((9, 2_000), (5, 20_000), (4, 40_000), (1, 100_000)),
+    "gzip": ((9, 10_000), (6, 30_000), (4, 50_000), (1, 80_000)),
+}
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=level)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def choose_encoding(accept_encoding: Optional[bytes]) -> Optional[str]:
+    """
+    Best supported encoding for an Accept-Encoding header value, None for identity
+    Honours q-values (q=0 refuses) and the * wildcard
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.decode("latin-1").lower().split(","):
+        pieces = part.strip().split(";")
+        name = pieces[0].strip()
+        q = 1.0
+        for param in pieces[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: Optional[bytes], size: int) -> bool:
+    return (
+        size >= settings.COMPRESSION_MIN_BYTES
+        and content_type is not None
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+    )
+
+
+def add_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Append Accept-Encoding to an existing Vary header, or add one"""
+    for i, (key, value) in enumerate(headers):
+        if key.lower() == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[i] = (key, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
+
+
+class StaticBody:
+    """A body pre-compressed once per supported encoding at maximum level"""
+
+    def __init__(self, body: bytes, content_type: bytes = b"application/json"):
+        self.identity = body
+        self.compressible = is_compressible(content_type, len(body))
+        self.variants: Dict[str, bytes] = {}
+        if self.compressible:
+            for encoding in ENCODINGS:
+                packed = compress(body, encoding, 11 if encoding == "br" else 9)
+                if len(packed) < len(body):
+                    self.variants[encoding] = packed
+
+    def select(self, accept_encoding: Optional[bytes]) -> Tuple[bytes, Optional[str]]:
+        encoding = choose_encoding(accept_encoding) if self.variants else None
+        if encoding in self.variants:
+            return self.variants[encoding], encoding
+        return self.identity, None
+
+
+class AdaptiveCompressor:
+    """
+    Picks the compression level per response from measured throughput so that
+    compressing one body stays within budget_ms of CPU
+    """
+
+    def __init__(self, budget_ms: Optional[float] = None, smoothing: float = 0.2):
+        self.budget_ms = budget_ms if budget_ms is not None else settings.COMPRESSION_BUDGET_MS
+        self.smoothing = smoothing
+        self.throughput: Dict[Tuple[str, int], float] = {
+            (encoding, level): guess
+            for encoding, levels in DYNAMIC_LEVELS.items()
+            for level, guess in levels
+        }
+
+    def pick_level(self, encoding: str, size: int) -> int:
+        levels = DYNAMIC_LEVELS[encoding]
+        for level, _ in levels:
+            if size / self.throughput[(encoding, level)] <= self.budget_ms:
+                return level
+        return levels[-1][0]
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        level = self.pick_level(encoding, len(body))
+        start = time.perf_counter()
+        packed = compress(body, encoding, level)
+        elapsed_ms = max((time.perf_counter() - start) * 1000, 1e-3)
+        key = (encoding, level)
+        self.throughput[key] += self.smoothing * (len(body) / elapsed_ms - self.throughput[key])
+        return packed
+
+
+class CompressionMiddleware:
+    """
+    Raw ASGI middleware compressing complete (non-streamed) responses
+    Streamed bodies and already-encoded responses pass through untouched
+    """
+
+    def __init__(self, app, compressor: Optional[AdaptiveCompressor] = None):
+        self.app = app
+        self.compressor = compressor or AdaptiveCompressor()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept_encoding = value
+                break
+        encoding = choose_encoding(accept_encoding)
+        start_message = None
+
+        async def compressing_send(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = list(start.get("headers", []))
+            content_type = None
+            encoded = False
+            for key, value in headers:
+                lowered = key.lower()
+                if lowered == b"content-type":
+                    content_type = value
+                elif lowered == b"content-encoding":
+                    encoded = True
+
+            if message.get("more_body", False) or encoded or not is_compressible(content_type, len(body)):
+                await send(start)
+                await send(message)
+                return
+
+            headers = add_vary(headers)
+            if encoding is not None:
+                packed = self.compressor.compress(body, encoding)
+                if len(packed) < len(body):
+                    body = packed
+                    headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+                    headers += [(b"content-length", str(len(body)).encode()), (b"content-encoding", encoding.encode())]
+            await send({**start, "headers": headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, compressing_send)
@@ -28,6 +28,78 @@ class Settings:
     GEMINI_TEMPERATURE: float = 0.7
     GEMINI_MAX_OUTPUT_TOKENS: int = 2048  # Reduced for faster responses
     
+    # Per-intent generation limits (output length dominates LLM latency)
+    # Thinking tokens count against max_output_tokens; a reply cut off before any text
+    # is asked again once with GEMINI_MAX_OUTPUT_TOKENS
+    ADAPTIVE_GENERATION: bool = os.getenv("ADAPTIVE_GENERATION", "true").lower() == "true"
+    GENERATION_PROFILES: dict = {
+        "contact": {
+            "max_output_tokens": 256,
+            "temperature": 0.2,
+            "brevity": "Answer in one or two sentences with just the requested contact details and links.",
+        },
+        "education": {
+            "max_output_tokens": 384,
+            "temperature": 0.3,
+            "brevity": "Answer briefly as a short bullet list.",
+        },
+        "skills": {
+            "max_output_tokens": 512,
+            "temperature": 0.4,
+            "brevity": "Answer concisely, grouping skills by category.",
+        },
+        "achievements": {
+            "max_output_tokens": 512,
+            "temperature": 0.4,
+            "brevity": "Answer concisely as a bullet list.",
+        },
+        "experience": {
+            "max_output_tokens": 1024,
+            "temperature": 0.5,
+            "brevity": "Keep the answer focused on roles and measurable impact.",
+        },
+        "projects": {
+            "max_output_tokens": 1536,
+            "temperature": 0.7,
+            "brevity": "",
+        },
+        "general": {
+            "max_output_tokens": 1024,
+            "temperature": 0.7,
+            "brevity": "Keep the answer under 150 words unless asked for detail.",
+        },
+    }
+    
+    # Deadline & Hedging Settings
+    DEADLINE_HEADER: str = "X-Request-Deadline-Ms"  # Per-request budget in milliseconds
+    REQUEST_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_SECONDS", "25"))  # Default and upper cap
+    DEADLINE_RESERVE_SECONDS: float = 0.2  # Kept back for building the response
+    DEADLINE_MIN_MODEL_SECONDS: float = 1.0  # Degrade right away if less than this is left for the model
+    HEDGE_ENABLED: bool = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+    HEDGE_PERCENTILE: float = 95.0  # Send a second request once the first is slower than this
+    HEDGE_MIN_SAMPLES: int = 20  # Observed calls needed before hedging starts
+    LLM_MAX_WORKERS: int = 8
+    ANSWER_CACHE_SIZE: int = 256  # Recent answers kept for degraded responses
+    
+    # Admission Control Settings (/chat)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_SESSION_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_SESSION_PER_MINUTE", "10"))
+    RATE_LIMIT_SESSION_BURST: int = int(os.getenv("RATE_LIMIT_SESSION_BURST", "5"))
+    RATE_LIMIT_IP_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", "30"))  # Covers rotating session IDs
+    RATE_LIMIT_IP_BURST: int = int(os.getenv("RATE_LIMIT_IP_BURST", "10"))
+    RATE_LIMIT_MAX_CLIENTS: int = 50_000  # Idle buckets expire on their own; the oldest go first past this
+    TRUST_PROXY_HEADERS: bool = os.getenv("TRUST_PROXY_HEADERS", "false").lower() == "true"  # Only behind a proxy that sets X-Forwarded-For
+    FAIR_QUEUE_ENABLED: bool = os.getenv("FAIR_QUEUE_ENABLED", "true").lower() == "true"
+    FAIR_QUEUE_CONCURRENCY: int = int(os.getenv("FAIR_QUEUE_CONCURRENCY", "4"))  # Gemini requests in flight, hedges included
+    
+    # Serve /, /health, /profile and /quick-info from pre-rendered bytes ahead of FastAPI
+    FAST_LANE_ENABLED: bool = os.getenv("FAST_LANE_ENABLED", "true").lower() == "true"
+    
+    # Response Compression Settings (gzip, plus brotli when installed)
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_BYTES: int = 500  # Smaller bodies are sent as-is
+    COMPRESSION_BUDGET_MS: float = 2.0  # CPU budget per dynamic response; picks the compression level
+    
     # Memory Settings
     MAX_CONVERSATION_HISTORY: int = 10  # Keep only last 10 messages
     
@@ -35,6 +107,34 @@ class Settings:
     DEFAULT_SESSION_ID: str = "default"
     SESSION_TIMEOUT_MINUTES: int = 30
     
+    # Multi-Tenant Settings (one deployment, many portfolio bots)
+    TENANT_HEADER: str = "X-Tenant-Id"
+    DEFAULT_TENANT_ID: str = "anshul"  # Served from profile_data.py
+    TENANT_DIR: str = os.getenv("TENANT_DIR", "tenants")  # <tenant_id>.json / .yaml files
+    TENANT_CACHE_MAX_BYTES: int = int(os.getenv("TENANT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    
+    # Conversation Journal Settings (write-behind, off by default)
+    JOURNAL_ENABLED: bool = os.getenv("JOURNAL_ENABLED", "false").lower() == "true"
+    JOURNAL_DIR: str = os.getenv("JOURNAL_DIR", "/tmp/anshul-journal")  # /tmp is the only writable path on Vercel
+    JOURNAL_QUEUE_SIZE: int = 10000  # Turns beyond this are dropped and counted
+    JOURNAL_BATCH_SIZE: int = 256
+    JOURNAL_FLUSH_INTERVAL_SECONDS: float = 1.0
+    JOURNAL_SEGMENT_MAX_BYTES: int = 4 * 1024 * 1024
+    JOURNAL_SEGMENT_MAX_AGE_SECONDS: float = 300.0
+    
+    # Traffic Capture Settings (anonymized request log for replay.py)
+    CAPTURE_ENABLED: bool = os.getenv("CAPTURE_ENABLED", "false").lower() == "true"
+    CAPTURE_DIR: str = os.getenv("CAPTURE_DIR", "/tmp/anshul-capture")
+    CAPTURE_SALT: str = os.getenv("CAPTURE_SALT", "")  # Random per process when empty
+    
+    # Profiling Settings (sampling profiler, only for triggered requests)
+    PROFILE_TOKEN: str = os.getenv("PROFILE_TOKEN", "")  # Send in PROFILE_HEADER to profile one request
+    PROFILE_HEADER: str = "X-Profile-Token"
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # Fraction of requests profiled (needs PROFILE_TOKEN)
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "/tmp/anshul-profiles")
+    PROFILE_INTERVAL_SECONDS: float = 0.002
+    PROFILE_KEEP: int = 50  # Oldest profiles are deleted beyond this
+    
     def validate(self):
         """Validate required settings - returns True if valid, raises ValueError if not"""
         if not self.GOOGLE_API_KEY:
@@ -48,6 +148,10 @@ class Settings:
     def is_configured(self) -> bool:
         """Check if API key is configured without raising exception"""
         return bool(self.GOOGLE_API_KEY)
+    
+    def profiling_enabled(self) -> bool:
+        """Check if the request profiler can ever trigger (sampled profiles are only readable with the token)"""
+        return bool(self.PROFILE_TOKEN)
 
 # Create settings instance
 settings = Settings()
@@ -0,0 +1,44 @@
+"""
+Shared pytest fixtures
+app_env swaps main's globals through monkeypatch, so a failing test cannot leak a fake
+agent, settings overrides or sessions into the tests that run after it
+"""
+from typing import Optional
+
+import pytest
+
+import main
+from agent import AnshulChatAgent
+from fake_model import FakeGenerativeModel
+
+
+class AppEnv:
+    """What a test gets from app_env: helpers that are undone when the test ends"""
+
+    def __init__(self, monkeypatch):
+        self.monkeypatch = monkeypatch
+
+    def use_agent(self, agent: Optional[AnshulChatAgent] = None) -> AnshulChatAgent:
+        """Serve requests with agent (default: one on an instant fake model)"""
+        agent = agent or AnshulChatAgent(model=FakeGenerativeModel())
+        self.monkeypatch.setattr(main, "get_agent", lambda: agent)
+        return agent
+
+    def set(self, **overrides):
+        """Override main.settings attributes; cached rate limits and tenants are rebuilt from them"""
+        for name, value in overrides.items():
+            self.monkeypatch.setattr(main.settings, name, value)
+        main.get_rate_limits.cache_clear()
+        main.get_tenants.cache_clear()
+
+
+@pytest.fixture
+def app_env(monkeypatch):
+    """main with fresh rate limits, tenants and sessions, restored after the test"""
+    main.get_rate_limits.cache_clear()
+    main.get_tenants.cache_clear()
+    main.sessions.clear()
+    yield AppEnv(monkeypatch)
+    main.sessions.clear()
+    main.get_rate_limits.cache_clear()
+    main.get_tenants.cache_clear()
@@ -0,0 +1,71 @@
+"""
+Request deadlines and upstream latency tracking
+A Deadline is created when a request arrives and passed down to the agent,
+which degrades to a fast-path answer instead of overrunning it
+"""
+import math
+import time
+from collections import deque
+from typing import Optional
+
+from config import settings
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the model could not answer in time; carries the degraded answer"""
+
+    def __init__(self, fallback: str = ""):
+        super().__init__("Request deadline exceeded")
+        self.fallback = fallback
+
+
+class Deadline:
+    """Absolute point in time (monotonic clock) by which a request must be answered"""
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    @classmethod
+    def from_header(cls, value: Optional[str]) -> "Deadline":
+        """
+        Budget in milliseconds from the deadline header, capped by REQUEST_DEADLINE_SECONDS
+        Missing or malformed values fall back to the configured default
+        """
+        seconds = settings.REQUEST_DEADLINE_SECONDS
+        if value:
+            try:
+                requested = float(value) / 1000
+            except ValueError:
+                requested = None
+            if requested is not None and math.isfinite(requested) and requested > 0:
+                seconds = min(seconds, requested)
+        return cls.after(seconds)
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class LatencyTracker:
+    """Rolling window of upstream call latencies, used to decide when to hedge"""
+
+    def __init__(self, window: int = 200, min_samples: Optional[int] = None):
+        self.samples: deque = deque(maxlen=window)
+        self.min_samples = min_samples if min_samples is not None else settings.HEDGE_MIN_SAMPLES
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """q-th percentile of the window, None until enough samples are seen"""
+        values = sorted(self.samples)
+        if len(values) < max(self.min_samples, 1):
+            return None
+        rank = math.ceil(q / 100 * len(values))
+        return values[min(len(values), max(rank, 1)) - 1]
@@ -0,0 +1,260 @@
+"""
+Per-client admission control for /chat
+- TokenBuckets: rate limit per client key, in an expiring table whose idle entries vanish;
+  acquire_all() takes a token from several buckets only if every one of them has one
+- FairQueue: weighted fair queueing of LLM calls, so a client with many requests in
+  flight is interleaved with everyone else instead of being served first-come first-served
+"""
+import asyncio
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class TokenBuckets:
+    """
+    Token bucket per client key: rate tokens per second, up to burst
+    Entries are (tokens, last_seen) keyed by the key's hash and kept in last-seen order.
+    A bucket idle for burst / rate seconds is full again, so it is indistinguishable
+    from a new one and is dropped; max_clients caps memory under key churn
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 50_000):
+        if rate <= 0 or burst < 1:
+            raise ValueError("Token buckets need a positive rate and a burst of at least 1")
+        self.rate = rate
+        self.burst = float(burst)
+        self.max_clients = max_clients
+        self.refill_seconds = self.burst / rate
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def acquire(self, key: str, now: Optional[float] = None) -> float:
+        """Take one token; returns 0.0 if allowed, else seconds until a token is available"""
+        return acquire_all([(self, key)], now)
+
+    def _take(self, slot: int, now: float) -> float:
+        """Refilled token count for slot, removed from the table until _put (lock held)"""
+        self._expire(now)
+        entry = self._buckets.pop(slot, None)
+        return self.burst if entry is None else min(self.burst, entry[0] + (now - entry[1]) * self.rate)
+
+    def _put(self, slot: int, tokens: float, now: float):
+        self._buckets[slot] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+    def _expire(self, now: float):
+        buckets = self._buckets
+        while buckets:
+            slot, (_, last_seen) = next(iter(buckets.items()))
+            if now - last_seen < self.refill_seconds:
+                break
+            del buckets[slot]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def stats(self) -> Dict:
+        return {"clients": len(self._buckets), "allowed": self.allowed, "limited": self.limited}
+
+
+def acquire_all(checks: List[Tuple[TokenBuckets, str]], now: Optional[float] = None) -> float:
+    """
+    Take one token for each (buckets, key), or none at all if any of them is empty
+    Returns 0.0 if allowed, else seconds until every bucket has a token again
+    """
+    now = time.monotonic() if now is None else now
+    with contextlib.ExitStack() as stack:
+        for _, lock in sorted({id(buckets): buckets._lock for buckets, _ in checks}.items()):
+            stack.enter_context(lock)
+        state = [(buckets, hash(key)) for buckets, key in checks]
+        state = [(buckets, slot, buckets._take(slot, now)) for buckets, slot in state]
+        allowed = all(tokens >= 1.0 for _, _, tokens in state)
+        wait = 0.0
+        for buckets, slot, tokens in state:
+            if allowed:
+                tokens -= 1.0
+                buckets.allowed += 1
+            elif tokens < 1.0:
+                wait = max(wait, (1.0 - tokens) / buckets.rate)
+                buckets.limited += 1
+            buckets._put(slot, tokens, now)
+        return wait
+
+
+class FairSlot:
+    """
+    One granted FairQueue slot
+    The slot is released once its owner calls done() and every future attached to it
+    has finished, so upstream calls abandoned past a deadline still count as in flight
+    """
+
+    def __init__(self, queue: "FairQueue", client: str, weight: float):
+        self.queue = queue
+        self.client = client
+        self.weight = weight
+        self._holds = 1
+        self._lock = threading.Lock()
+
+    def attach(self, future):
+        """Keep the slot until future finishes or is cancelled"""
+        with self._lock:
+            self._holds += 1
+        future.add_done_callback(lambda _: self.done())
+
+    def done(self):
+        with self._lock:
+            self._holds -= 1
+            last = self._holds == 0
+        if last:
+            self.queue.release()
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _Waiter:
+    __slots__ = ("start", "granted", "cancelled", "event", "loop", "future")
+
+    def __init__(self, start: float, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.start = start
+        self.granted = False
+        self.cancelled = False
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+
+    def wake(self) -> bool:
+        if self.event is not None:
+            self.event.set()
+            return True
+        try:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+        except RuntimeError:  # Loop already closed, nobody is waiting any more
+            return False
+        return True
+
+
+class FairQueue:
+    """
+    Weighted fair queue admitting up to `concurrency` callers at a time
+    Each request gets a virtual finish tag max(virtual time, client's last tag) + 1 / weight;
+    freed slots go to the smallest tag, so backlogged clients alternate in proportion
+    to their weights and a client that just arrived is not stuck behind another's backlog
+    Threads wait with acquire(), event-loop code with acquire_async() so that waiting
+    requests do not tie up worker threads
+    """
+
+    PRUNE_AT = 1024  # Forget finish tags already behind virtual time past this many clients
+
+    def __init__(self, concurrency: int):
+        if concurrency < 1:
+            raise ValueError("FairQueue needs a concurrency of at least 1")
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._heap: List = []
+        self._finish: Dict[str, float] = {}
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self.active = 0
+        self.granted = 0
+        self.timeouts = 0
+
+    def _tag(self, client: str, weight: float) -> Tuple[float, float]:
+        start = max(self._virtual_time, self._finish.get(client, 0.0))
+        finish = start + 1.0 / weight
+        self._finish[client] = finish
+        return start, finish
+
+    def _grant_now(self, start: float):
+        self.active += 1
+        self._virtual_time = start
+        self.granted += 1
+
+    def _enqueue(self, client: str, weight: float, loop=None) -> Optional[_Waiter]:
+        """None if a slot was free and is now taken, else the queued waiter"""
+        with self._lock:
+            start, finish = self._tag(client, weight)
+            if self.active < self.concurrency and not self._heap:
+                self._grant_now(start)
+                return None
+            waiter = _Waiter(start, loop)
+            heapq.heappush(self._heap, (finish, next(self._seq), waiter))
+            return waiter
+
+    def _settle(self, waiter: _Waiter, client: str, weight: float) -> Optional[FairSlot]:
+        with self._lock:
+            if waiter.granted:  # Possibly granted while timing out
+                return FairSlot(self, client, weight)
+            waiter.cancelled = True
+            self.timeouts += 1
+            return None
+
+    def acquire(self, client: str, weight: float = 1.0, timeout: Optional[float] = None) -> Optional[FairSlot]:
+        """Block until a slot is granted; None if timeout (seconds) passes first"""
+        waiter = self._enqueue(client, weight)
+        if waiter is None:
+            return FairSlot(self, client, weight)
+        waiter.event.wait(None if timeout is None else max(0.0, timeout))
+        return self._settle(waiter, client, weight)
+
+    async def acquire_async(self, client: str, weight: float = 1.0,
+                            timeout: Optional[float] = None) -> Optional[FairSlot]:
+        """acquire() for coroutines: waits on the event loop instead of in a thread"""
+        waiter = self._enqueue(client, weight, asyncio.get_running_loop())
+        if waiter is None:
+            return FairSlot(self, client, weight)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), None if timeout is None else max(0.0, timeout))
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            slot = self._settle(waiter, client, weight)
+            if slot is not None:
+                slot.done()
+            raise
+        return self._settle(waiter, client, weight)
+
+    def try_acquire(self, client: str, weight: float = 1.0) -> Optional[FairSlot]:
+        """A slot only if one is idle and nobody is waiting (spare capacity, e.g. for hedges)"""
+        with self._lock:
+            if self.active >= self.concurrency or self._heap:
+                return None
+            start, _ = self._tag(client, weight)
+            self._grant_now(start)
+            return FairSlot(self, client, weight)
+
+    def release(self):
+        """Hand the slot to the next waiter in finish-tag order, or free it"""
+        with self._lock:
+            while self._heap:
+                _, _, waiter = heapq.heappop(self._heap)
+                if waiter.cancelled:
+                    continue
+                waiter.granted = True
+                if not waiter.wake():
+                    waiter.granted = False
+                    continue
+                self._virtual_time = waiter.start
+                self.granted += 1
+                return
+            self.active -= 1
+            if len(self._finish) > self.PRUNE_AT:
+                self._finish = {c: t for c, t in self._finish.items() if t > self._virtual_time}
+
+    def stats(self) -> Dict:
+        return {
+            "active": self.active,
+            "waiting": sum(1 for _, _, w in self._heap if not w.cancelled),
+            "granted": self.granted,
+            "timeouts": self.timeouts,
+        }
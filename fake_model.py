@@ -0,0 +1,137 @@
+"""
+Deterministic stand-in for genai.GenerativeModel
+Used by the replay harness, tests and benchmarks so they run without an API key
+"""
+import math
+import random
+import time
+from contextvars import ContextVar
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# (index, per-model RNGs) of the replayed request being served; the context follows the
+# request into worker threads, so its draws do not depend on which thread runs first
+_request_stream: ContextVar[Optional[Tuple[int, Dict]]] = ContextVar("fake_model_request", default=None)
+
+
+def begin_request(index: int):
+    """Give the current request its own random stream, derived from each model's seed and index"""
+    _request_stream.set((index, {}))
+
+
+def constant_latency(seconds: float) -> Callable[[random.Random], float]:
+    """Every call takes the same time"""
+    return lambda rng: seconds
+
+
+def lognormal_latency(median: float, sigma: float = 0.5) -> Callable[[random.Random], float]:
+    """Typical LLM latency shape: most calls near the median, a long right tail"""
+    mu = math.log(median)
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+def bimodal_latency(fast: float, slow: float, slow_fraction: float) -> Callable[[random.Random], float]:
+    """Heavy tail: a fixed fraction of calls hit a much slower path"""
+    return lambda rng: slow if rng.random() < slow_fraction else fast
+
+
+class FinishReason(Enum):
+    STOP = 1
+    MAX_TOKENS = 2
+
+
+class FakeCandidate:
+    def __init__(self, finish_reason: FinishReason):
+        self.finish_reason = finish_reason
+
+
+class FakeResponse:
+    """Like the real response, .text raises ValueError when the candidate has no text"""
+
+    def __init__(self, text: Optional[str], finish_reason: FinishReason = FinishReason.STOP):
+        self._text = text
+        self.candidates = [FakeCandidate(finish_reason)]
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            raise ValueError("The response has no text parts")
+        return self._text
+
+
+class FakeChat:
+    def __init__(self, model: "FakeGenerativeModel", history: List[Dict]):
+        self.model = model
+        self.history = history
+
+    def send_message(self, content, generation_config: Optional[Dict] = None, **kwargs) -> FakeResponse:
+        delay = self.model.next_latency()
+        reply = self.model.reply
+        if self.model.tokens_per_second:
+            tokens = self.model.output_tokens(generation_config)
+            delay += tokens / self.model.tokens_per_second
+            reply = " ".join(["token"] * tokens)
+        if delay > 0:
+            time.sleep(delay)
+        self.model.calls += 1
+        self.model.last_request = {"content": content, "generation_config": generation_config}
+        budget = (generation_config or {}).get("max_output_tokens")
+        if budget and self.model.thinking_tokens >= budget:
+            return FakeResponse(None, FinishReason.MAX_TOKENS)
+        return FakeResponse(reply)
+
+
+class FakeGenerativeModel:
+    """
+    Mimics the parts of genai.GenerativeModel that AnshulChatAgent uses
+    Latency is drawn from a seeded RNG, so a replay with the same seed is repeatable;
+    inside begin_request() each request draws from its own stream, so concurrent
+    replays repeat too
+    With tokens_per_second set, latency also grows with the reply length, which is
+    drawn from natural_tokens and capped by max_output_tokens like the real API
+    thinking_tokens are spent before any text: a budget no larger than that yields
+    an empty response stopped at MAX_TOKENS, as thinking models do
+    """
+
+    def __init__(
+        self,
+        latency: Optional[Callable[[random.Random], float]] = None,
+        reply: str = "Anshul is a Generative AI Developer. Portfolio: https://anshul-dev-profolio.vercel.app/",
+        seed: int = 0,
+        tokens_per_second: Optional[float] = None,
+        natural_tokens: Optional[Callable[[random.Random], int]] = None,
+        thinking_tokens: int = 0,
+    ):
+        self.latency = latency or constant_latency(0.0)
+        self.reply = reply
+        self.tokens_per_second = tokens_per_second
+        self.natural_tokens = natural_tokens or (lambda rng: 400)
+        self.thinking_tokens = thinking_tokens
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.last_request: Optional[Dict] = None  # Prompt and generation_config of the latest call
+
+    def request_rng(self) -> random.Random:
+        """The current request's stream, or the model-wide one outside begin_request()"""
+        stream = _request_stream.get()
+        if stream is None:
+            return self.rng
+        index, rngs = stream
+        rng = rngs.get(id(self))
+        if rng is None:
+            rng = rngs.setdefault(id(self), random.Random(f"{self.seed}:{index}"))
+        return rng
+
+    def next_latency(self) -> float:
+        return self.latency(self.request_rng())
+
+    def output_tokens(self, generation_config: Optional[Dict] = None) -> int:
+        tokens = self.natural_tokens(self.request_rng())
+        if generation_config and generation_config.get("max_output_tokens"):
+            tokens = min(tokens, max(0, generation_config["max_output_tokens"] - self.thinking_tokens))
+        return tokens
+
+    def start_chat(self, history: Optional[List[Dict]] = None) -> FakeChat:
+        return FakeChat(self, history or [])
@@ -0,0 +1,176 @@
+"""
+Raw ASGI fast lane in front of the FastAPI app
+Mostly-static routes are answered from pre-rendered JSON bytes with the CORS headers
+baked in, skipping routing, dependency injection, validation and the CORS middleware.
+Anything the fast lane does not recognise is passed through unchanged
+"""
+import json
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from fastapi.encoders import jsonable_encoder
+
+from compression import AdaptiveCompressor, StaticBody, add_vary, choose_encoding, is_compressible
+
+Builder = Callable[[], Awaitable[Any]]
+KeyedBuilder = Callable[[str], Awaitable[Any]]
+
+JSON_HEADERS = [(b"content-type", b"application/json")]
+# Same headers CORSMiddleware(allow_origins=["*"], allow_credentials=True) adds to simple responses
+CORS_HEADERS = [(b"access-control-allow-origin", b"*"), (b"access-control-allow-credentials", b"true")]
+
+
+def render_json(content: Any) -> bytes:
+    """Byte-for-byte what FastAPI's default JSONResponse would send"""
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastLane:
+    """
+    ASGI dispatcher with three kinds of routes
+    - static: builder awaited once, bytes reused for every request
+    - dynamic: builder awaited per request, only the framework overhead is skipped
+    - keyed: POST routes whose JSON body selects one of a few static answers
+    A builder that raises sends the request down the normal FastAPI path instead,
+    so error responses are always the app's own
+    With compression on, static bodies are pre-compressed once per encoding and
+    dynamic ones go through the same adaptive compressor as CompressionMiddleware
+    """
+
+    def __init__(self, app, bypass_headers: Iterable[str] = (), compression: bool = False,
+                 compressor: Optional[AdaptiveCompressor] = None):
+        self.app = app
+        self.bypass_headers = {h.lower().encode() for h in bypass_headers}
+        self.compression = compression
+        self.compressor = compressor or (AdaptiveCompressor() if compression else None)
+        self._static: Dict[Tuple[str, str], Builder] = {}
+        self._dynamic: Dict[Tuple[str, str], Builder] = {}
+        self._keyed: Dict[Tuple[str, str], Tuple[str, KeyedBuilder]] = {}
+        self._cache: Dict[Tuple[str, str, Optional[str]], Union[bytes, StaticBody]] = {}
+
+    def static(self, method: str, path: str, builder: Builder):
+        self._static[(method, path)] = builder
+
+    def dynamic(self, method: str, path: str, builder: Builder):
+        self._dynamic[(method, path)] = builder
+
+    def keyed(self, method: str, path: str, field: str, builder: KeyedBuilder):
+        self._keyed[(method, path)] = (field, builder)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = (scope["method"], scope["path"])
+        if route not in self._static and route not in self._dynamic and route not in self._keyed:
+            await self.app(scope, receive, send)
+            return
+
+        request = {}
+        for key, value in scope["headers"]:
+            if key in self.bypass_headers:
+                await self.app(scope, receive, send)
+                return
+            if key in (b"origin", b"cookie", b"content-type", b"accept-encoding"):
+                request[key] = value
+
+        if route in self._keyed:
+            await self._serve_keyed(route, scope, receive, send, request)
+            return
+
+        if route in self._static:
+            body = await self._render_cached((route[0], route[1], None), self._static[route])
+        else:
+            try:
+                body = render_json(await self._dynamic[route]())
+            except Exception:
+                body = None
+        if body is None:
+            await self.app(scope, receive, send)
+            return
+        await self._respond(send, body, request)
+
+    async def _serve_keyed(self, route, scope, receive, send, request):
+        raw = b""
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return
+            raw += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        body = None
+        content_type = request.get(b"content-type")
+        if content_type is None or b"json" in content_type:
+            field, builder = self._keyed[route]
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                data = None
+            value = data.get(field) if isinstance(data, dict) else None
+            if isinstance(value, str):
+                body = await self._render_cached((route[0], route[1], value), lambda: builder(value))
+
+        if body is None:
+            replayed = False
+
+            async def replay_receive():
+                nonlocal replayed
+                if not replayed:
+                    replayed = True
+                    return {"type": "http.request", "body": raw, "more_body": False}
+                return await receive()
+
+            await self.app(scope, replay_receive, send)
+            return
+        await self._respond(send, body, request)
+
+    async def _render_cached(self, key, builder: Builder) -> Optional[Union[bytes, StaticBody]]:
+        body = self._cache.get(key)
+        if body is None:
+            try:
+                content = render_json(await builder())
+            except Exception:
+                return None
+            body = StaticBody(content) if self.compression else content
+            self._cache[key] = body
+        return body
+
+    async def _respond(self, send, body, request: Dict[bytes, bytes]):
+        """Send a rendered body (bytes or StaticBody) with negotiated encoding and CORS headers"""
+        accept_encoding = request.get(b"accept-encoding")
+        encoding = None
+        compressible = False
+        if isinstance(body, StaticBody):
+            compressible = body.compressible
+            body, encoding = body.select(accept_encoding)
+        elif self.compression and is_compressible(JSON_HEADERS[0][1], len(body)):
+            compressible = True
+            encoding = choose_encoding(accept_encoding)
+            if encoding is not None:
+                packed = self.compressor.compress(body, encoding)
+                if len(packed) < len(body):
+                    body = packed
+                else:
+                    encoding = None
+
+        headers: List[Tuple[bytes, bytes]] = [(b"content-length", str(len(body)).encode())] + JSON_HEADERS
+        origin = request.get(b"origin")
+        if origin is not None:
+            if b"cookie" in request:
+                headers += [(b"access-control-allow-origin", origin), CORS_HEADERS[1], (b"vary", b"Origin")]
+            else:
+                headers += CORS_HEADERS
+        if compressible:
+            headers = add_vary(headers)
+        if encoding is not None:
+            headers.append((b"content-encoding", encoding.encode()))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
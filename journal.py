@@ -0,0 +1,280 @@
+"""
+Write-behind conversation journal
+Chat turns are queued in memory and flushed to NDJSON segments by a background thread,
+so recording a turn never touches the disk inside the request
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+from config import settings
+
+OPEN_SUFFIX = ".ndjson.open"
+SEALED_SUFFIX = ".ndjson"
+
+
+def _pid_alive(pid: int) -> bool:
+    """Check whether a process with this pid is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ConversationJournal:
+    """
+    Append-only journal of chat turns
+    - record() only appends to a bounded in-memory queue (drops when full)
+    - A daemon thread batch-flushes the queue to the active segment
+    - Segments rotate by size or age; the active one carries an .open suffix
+    - A batch that fails to write goes back to the front of the queue and the segment
+      it was cut off in is abandoned, so a transient disk error loses nothing
+    - Open segments left behind by a crashed process are repaired on start()
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        segment_max_bytes: Optional[int] = None,
+        segment_max_age: Optional[float] = None,
+    ):
+        self.directory = directory or settings.JOURNAL_DIR
+        self.queue_size = queue_size or settings.JOURNAL_QUEUE_SIZE
+        self.batch_size = batch_size or settings.JOURNAL_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.JOURNAL_FLUSH_INTERVAL_SECONDS
+        self.segment_max_bytes = segment_max_bytes or settings.JOURNAL_SEGMENT_MAX_BYTES
+        self.segment_max_age = segment_max_age or settings.JOURNAL_SEGMENT_MAX_AGE_SECONDS
+
+        self._queue: deque = deque()
+        self._queue_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._segment = None
+        self._segment_path: Optional[str] = None
+        self._segment_bytes = 0
+        self._segment_opened_at = 0.0
+        self._segment_seq = 0
+
+        # Counters
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.write_errors = 0
+        self.segments_sealed = 0
+        self.recovered_segments = 0
+
+    # ------------------------------------------------------------------ hot path
+
+    def record(self, session_id: str, message: str, response: str, **extra) -> bool:
+        """
+        Queue one chat turn for persistence
+
+        Returns:
+            False if the queue was full and the turn was dropped
+        """
+        entry = {"ts": time.time(), "session_id": session_id, "message": message, "response": response}
+        if extra:
+            entry.update(extra)
+        return self.append(entry)
+
+    def append(self, entry: Dict) -> bool:
+        """Queue an arbitrary JSON-serializable entry, returns False if dropped"""
+        with self._queue_lock:
+            if len(self._queue) >= self.queue_size:
+                self.dropped += 1
+                return False
+            self._queue.append(entry)
+            self.recorded += 1
+            pending = len(self._queue)
+
+        if pending >= self.batch_size:
+            self._wake.set()
+        return True
+
+    # ------------------------------------------------------------------ lifecycle
+
+    def start(self):
+        """Recover leftover segments and start the background flusher"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.recover()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="conversation-journal", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: float = 5.0):
+        """Stop the flusher, write whatever is still queued and seal the active segment"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+        with self._flush_lock:
+            self._seal_segment()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Journal flush failed: {e}")
+
+    # ------------------------------------------------------------------ flushing
+
+    def flush(self) -> int:
+        """Write all queued turns to the active segment, returns number written"""
+        with self._flush_lock:
+            with self._queue_lock:
+                if not self._queue:
+                    batch = None
+                else:
+                    batch = list(self._queue)
+                    self._queue.clear()
+
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except OSError:
+                    self.write_errors += 1
+                    self._abandon_segment()
+                    self._requeue(batch)
+                    raise
+
+            if self._segment is not None and (
+                self._segment_bytes >= self.segment_max_bytes
+                or time.time() - self._segment_opened_at >= self.segment_max_age
+            ):
+                self._seal_segment()
+
+            return len(batch) if batch else 0
+
+    def _write_batch(self, batch: List[Dict]):
+        data = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in batch).encode("utf-8")
+        if self._segment is None:
+            self._open_segment()
+        self._segment.write(data)
+        self._segment.flush()
+        self._segment_bytes += len(data)
+        self.flushed += len(batch)
+
+    def _requeue(self, batch: List[Dict]):
+        """Put an unwritten batch back in front of newer turns; the newest drop if it no longer fits"""
+        with self._queue_lock:
+            self._queue.extendleft(reversed(batch))
+            while len(self._queue) > self.queue_size:
+                self._queue.pop()
+                self.dropped += 1
+
+    def _abandon_segment(self):
+        """
+        Stop appending to a segment after a failed write, cut back to its last whole batch
+        It stays open-suffixed until recover() seals it on the next start()
+        """
+        if self._segment is None:
+            return
+        segment, path, good_bytes = self._segment, self._segment_path, self._segment_bytes
+        self._segment = None
+        self._segment_path = None
+        for cleanup in (segment.close, lambda: os.truncate(path, good_bytes)):
+            try:
+                cleanup()
+            except OSError:
+                pass
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._segment_seq += 1
+        # Names sort by open time, so read_journal() replays segments in order
+        name = f"journal-{time.time_ns():020d}-{os.getpid()}-{self._segment_seq:06d}{OPEN_SUFFIX}"
+        self._segment_path = os.path.join(self.directory, name)
+        self._segment = open(self._segment_path, "ab")
+        self._segment_bytes = 0
+        self._segment_opened_at = time.time()
+
+    def _seal_segment(self):
+        if self._segment is None:
+            return
+        self._segment.close()
+        os.replace(self._segment_path, self._segment_path[: -len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+        self._segment = None
+        self._segment_path = None
+        self.segments_sealed += 1
+
+    # ------------------------------------------------------------------ recovery
+
+    def recover(self) -> int:
+        """
+        Seal open segments left behind by dead processes
+        A torn last line (crash mid-write) is truncated away before sealing
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+
+        recovered = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(OPEN_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            if path == self._segment_path:
+                continue
+            try:
+                pid = int(name.split("-")[2])
+            except (IndexError, ValueError):
+                pid = None
+            if pid is not None and pid != os.getpid() and _pid_alive(pid):
+                continue
+
+            with open(path, "r+b") as f:
+                data = f.read()
+                end = data.rfind(b"\n") + 1
+                if end != len(data):
+                    f.truncate(end)
+            os.replace(path, path[: -len(OPEN_SUFFIX)] + SEALED_SUFFIX)
+            recovered += 1
+
+        self.recovered_segments += recovered
+        return recovered
+
+    def stats(self) -> Dict:
+        """Journal counters for health reporting"""
+        return {
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+            "pending": len(self._queue),
+            "segments_sealed": self.segments_sealed,
+            "recovered_segments": self.recovered_segments,
+        }
+
+
+def read_journal(directory: str) -> Iterator[Dict]:
+    """Iterate journaled turns in segment order, skipping torn or corrupt lines"""
+    if not os.path.isdir(directory):
+        return
+    names = sorted(n for n in os.listdir(directory) if n.endswith(SEALED_SUFFIX) or n.endswith(OPEN_SUFFIX))
+    for name in names:
+        with open(os.path.join(directory, name), "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
@@ -3,7 +3,10 @@ FastAPI Backend for Anshul Parate Portfolio Chatbot
 Minimal dependencies version for Vercel deployment
 No LangChain/LangGraph - uses Google Generative AI SDK directly
 """
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hmac
+from fastapi import FastAPI, HTTPException, Header, Depends, Request
+from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict
@@ -13,7 +16,14 @@ from functools import lru_cache
 # Import settings and agent
 from config import settings
 from agent import AnshulChatAgent
-from profile_data import ANSHUL_PROFILE
+from deadline import Deadline, DeadlineExceeded
+from journal import ConversationJournal
+from traffic import TrafficRecorder
+from profiler import ProfileStore, ProfilingMiddleware
+from tenants import TenantContext, TenantNotFound, TenantRegistry, default_tenant
+from fast_lane import FastLane
+from compression import AdaptiveCompressor, CompressionMiddleware
+from fair_share import TokenBuckets, acquire_all
 
 # Don't validate on module import - let it fail gracefully on first request
 # This prevents crashes during Vercel cold starts
@@ -34,6 +44,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiated gzip/brotli for dynamic responses above COMPRESSION_MIN_BYTES
+compressor = AdaptiveCompressor()
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, compressor=compressor)
+
+# Opt-in traffic capture for replay (nothing is registered when disabled)
+traffic_recorder: Optional[TrafficRecorder] = None
+if settings.CAPTURE_ENABLED:
+    traffic_recorder = TrafficRecorder(client_key=lambda request: client_ip(request))
+    app.middleware("http")(traffic_recorder.middleware)
+
+# On-demand request profiler (not installed without PROFILE_TOKEN, which also guards /profiles)
+profile_store = ProfileStore()
+if settings.profiling_enabled():
+    app.add_middleware(ProfilingMiddleware, store=profile_store)
+
 # Pydantic models
 class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, description="User's message")
@@ -44,6 +70,7 @@ class ChatResponse(BaseModel):
     success: bool = Field(default=True)
     timestamp: datetime = Field(default_factory=datetime.now)
     message_count: int = Field(..., description="Number of messages in conversation")
+    degraded: bool = Field(default=False, description="True if answered from the fast path because the deadline was near")
 
 class QuickInfoRequest(BaseModel):
     info_type: str = Field(..., description="Type: contact, projects, skills, education, experience, achievements, summary")
@@ -58,6 +85,7 @@ class SessionData:
     def __init__(self):
         self.messages = []
         self.last_activity = datetime.now()
+        self.lock = asyncio.Lock()  # One turn at a time; each turn builds on the previous messages
     
     def update_activity(self):
         self.last_activity = datetime.now()
@@ -74,6 +102,69 @@ def get_agent():
     """Cached agent initialization for faster responses"""
     return AnshulChatAgent()
 
+@lru_cache()
+def get_journal() -> ConversationJournal:
+    """Cached write-behind conversation journal"""
+    return ConversationJournal()
+
+@lru_cache()
+def get_tenants() -> TenantRegistry:
+    """Cached lazy tenant registry"""
+    return TenantRegistry()
+
+@lru_cache()
+def get_rate_limits() -> Dict[str, TokenBuckets]:
+    """Cached per-IP and per-session token buckets for /chat"""
+    return {
+        "ip": TokenBuckets(settings.RATE_LIMIT_IP_PER_MINUTE / 60, settings.RATE_LIMIT_IP_BURST,
+                           settings.RATE_LIMIT_MAX_CLIENTS),
+        "session": TokenBuckets(settings.RATE_LIMIT_SESSION_PER_MINUTE / 60, settings.RATE_LIMIT_SESSION_BURST,
+                                settings.RATE_LIMIT_MAX_CLIENTS),
+    }
+
+def client_ip(http_request: Request) -> str:
+    """
+    Caller address for rate limiting: the socket peer, or with TRUST_PROXY_HEADERS the
+    right-most X-Forwarded-For hop, the one our own proxy appended (earlier hops are client-supplied)
+    """
+    if settings.TRUST_PROXY_HEADERS:
+        forwarded = http_request.headers.get("x-forwarded-for")
+        if forwarded:
+            hop = forwarded.split(",")[-1].strip()
+            if hop:
+                return hop
+    return http_request.client.host if http_request.client else "unknown"
+
+def check_rate_limit(ip: str, session: str):
+    """
+    Raise 429 with Retry-After once the IP or the session runs out of tokens
+    A rejected message costs neither, so a session over its limit does not drain its IP's other sessions
+    """
+    limits = get_rate_limits()
+    wait = acquire_all([(limits["ip"], ip), (limits["session"], f"{ip}|{session}")])
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many messages, please slow down",
+            headers={"Retry-After": str(max(1, round(wait)))}
+        )
+
+def get_tenant(x_tenant_id: Optional[str] = Header(default=None, alias=settings.TENANT_HEADER)) -> TenantContext:
+    """Resolve the request's tenant (no header: the built-in profile)"""
+    try:
+        return get_tenants().get(x_tenant_id)
+    except TenantNotFound:
+        raise HTTPException(status_code=404, detail=f"Unknown tenant: {x_tenant_id}")
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=f"Invalid profile for tenant {x_tenant_id}: {str(e)}")
+
+def session_key(session_id: str, tenant: TenantContext) -> str:
+    """
+    Namespace sessions per tenant, the default tenant included
+    Tenant IDs cannot contain ':', so no session ID can reach another tenant's key
+    """
+    return f"{tenant.tenant_id}:{session_id}"
+
 def get_or_create_session(session_id: str) -> SessionData:
     """Get existing session or create new one"""
     if session_id not in sessions:
@@ -106,18 +197,37 @@ async def startup_event():
     except Exception as e:
         print(f"⚠️ Agent initialization warning: {e}")
         print("⚠️ Check that GOOGLE_API_KEY is set in Vercel environment variables")
+    
+    if settings.JOURNAL_ENABLED:
+        try:
+            get_journal().start()
+            print(f"📝 Journal: {settings.JOURNAL_DIR}")
+        except Exception as e:
+            print(f"⚠️ Journal disabled: {e}")
+    
+    if traffic_recorder is not None:
+        traffic_recorder.start()
+        print(f"🎥 Capturing traffic to {settings.CAPTURE_DIR}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush pending journal and capture records"""
+    if settings.JOURNAL_ENABLED:
+        get_journal().close()
+    if traffic_recorder is not None:
+        traffic_recorder.close()
 
 @app.get("/")
-async def root():
+async def root(tenant: TenantContext = Depends(get_tenant)):
     """Root endpoint with API information"""
     return {
         "message": f"Welcome to {settings.APP_NAME}",
         "version": settings.APP_VERSION,
         "status": "running",
         "profile": {
-            "name": ANSHUL_PROFILE.contact.name,
-            "role": ANSHUL_PROFILE.contact.role,
-            "portfolio": str(ANSHUL_PROFILE.contact.portfolio)
+            "name": tenant.profile.contact.name,
+            "role": tenant.profile.contact.role,
+            "portfolio": str(tenant.profile.contact.portfolio)
         },
         "features": [
             "Fast responses with Gemini Flash",
@@ -141,16 +251,27 @@ async def root():
 async def health_check():
     """Health check endpoint"""
     cleanup_expired_sessions()
-    return {
+    health = {
         "status": "healthy",
         "model": settings.GEMINI_MODEL,
         "active_sessions": len(sessions),
         "memory_limit": settings.MAX_CONVERSATION_HISTORY,
         "timestamp": datetime.now()
     }
+    health["tenants"] = get_tenants().stats()
+    if settings.RATE_LIMIT_ENABLED:
+        health["rate_limits"] = {name: buckets.stats() for name, buckets in get_rate_limits().items()}
+    if settings.JOURNAL_ENABLED:
+        health["journal"] = get_journal().stats()
+    return health
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(
+    request: ChatRequest,
+    http_request: Request,
+    x_request_deadline_ms: Optional[str] = Header(default=None, alias=settings.DEADLINE_HEADER),
+    tenant: TenantContext = Depends(get_tenant)
+):
     """
     Fast chat endpoint with 10-message memory
     
@@ -159,23 +280,46 @@ async def chat(request: ChatRequest):
     - Direct Google Generative AI SDK
     - Efficient message trimming
     - Context pre-fetching for relevant queries
+    - Deadline propagation (X-Request-Deadline-Ms), degrading to profile data when time runs out
+    - Per-IP and per-session token buckets (429) and a fair queue in front of Gemini
+    - Turns on the same session run one at a time
     """
+    deadline = Deadline.from_header(x_request_deadline_ms)
+    ip = client_ip(http_request)
+    if settings.RATE_LIMIT_ENABLED:
+        check_rate_limit(ip, session_key(request.session_id, tenant))
     try:
         # Get or create session
-        session_data = get_or_create_session(request.session_id)
+        session_data = get_or_create_session(session_key(request.session_id, tenant))
         
         # Get agent (cached)
         agent = get_agent()
         
-        # Process message
-        response, updated_messages = agent.chat(
-            request.message,
-            session_data.messages
-        )
+        # Process message off the event loop; the fair-queue wait stays on it
+        async with session_data.lock:
+            try:
+                response, updated_messages = await agent.chat_async(
+                    request.message,
+                    session_data.messages,
+                    deadline=deadline,
+                    tenant=tenant,
+                    client=ip
+                )
+            except DeadlineExceeded as e:
+                return ChatResponse(
+                    response=e.fallback,
+                    success=True,
+                    message_count=len([m for m in session_data.messages if m.get("role") != "system"]),
+                    degraded=True
+                )
+            
+            # Update session with trimmed messages
+            session_data.messages = updated_messages
+            session_data.update_activity()
         
-        # Update session with trimmed messages
-        session_data.messages = updated_messages
-        session_data.update_activity()
+        # Queue the turn for the journal (non-blocking)
+        if settings.JOURNAL_ENABLED:
+            get_journal().record(request.session_id, request.message, response, tenant_id=tenant.tenant_id)
         
         # Count messages (exclude system message)
         message_count = len([m for m in session_data.messages if m.get("role") != "system"])
@@ -192,7 +336,7 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
 @app.post("/quick-info")
-async def quick_info(request: QuickInfoRequest):
+async def quick_info(request: QuickInfoRequest, tenant: TenantContext = Depends(get_tenant)):
     """
     Get specific profile information without LLM (instant response)
     
@@ -207,7 +351,7 @@ async def quick_info(request: QuickInfoRequest):
     """
     try:
         agent = get_agent()
-        info = agent.get_quick_info(request.info_type)
+        info = agent.get_quick_info(request.info_type, tenant)
         
         if not info:
             raise HTTPException(
@@ -224,19 +368,23 @@ async def quick_info(request: QuickInfoRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/profile")
-async def get_full_profile():
+async def get_full_profile(tenant: TenantContext = Depends(get_tenant)):
     """Get complete profile information"""
     return {
-        "profile": ANSHUL_PROFILE.dict(),
+        "profile": tenant.profile.dict(),
         "success": True
     }
 
 @app.post("/reset")
-async def reset_conversation(session_id: str = settings.DEFAULT_SESSION_ID):
+async def reset_conversation(
+    session_id: str = settings.DEFAULT_SESSION_ID,
+    tenant: TenantContext = Depends(get_tenant)
+):
     """Reset conversation memory for a session"""
     try:
-        if session_id in sessions:
-            del sessions[session_id]
+        key = session_key(session_id, tenant)
+        if key in sessions:
+            del sessions[key]
             message = f"✅ Conversation reset for session: {session_id}"
         else:
             message = f"ℹ️ No active conversation found for session: {session_id}"
@@ -249,17 +397,19 @@ async def reset_conversation(session_id: str = settings.DEFAULT_SESSION_ID):
         raise HTTPException(status_code=500, detail=f"Error resetting conversation: {str(e)}")
 
 @app.get("/sessions")
-async def list_sessions():
-    """List all active sessions with details"""
+async def list_sessions(tenant: TenantContext = Depends(get_tenant)):
+    """List the caller's tenant's active sessions with details"""
     cleanup_expired_sessions()
-    
+
+    prefix = session_key("", tenant)
     session_list = [
         SessionInfo(
-            session_id=sid,
+            session_id=key[len(prefix):],
             message_count=len([m for m in data.messages if m.get("role") != "system"]),
             last_activity=data.last_activity
         )
-        for sid, data in sessions.items()
+        for key, data in sessions.items()
+        if key.startswith(prefix)
     ]
     
     return {
@@ -281,5 +431,47 @@ async def cleanup_sessions():
         "active": after_count
     }
 
+def check_profile_access(token: Optional[str]):
+    """Profiles are only visible to holders of PROFILE_TOKEN"""
+    if not settings.PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is not enabled")
+    if not hmac.compare_digest((token or "").encode(), settings.PROFILE_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+@app.get("/profiles")
+async def list_profiles(x_profile_token: Optional[str] = Header(default=None, alias=settings.PROFILE_HEADER)):
+    """List recent request profiles (collapsed stacks, newest first)"""
+    check_profile_access(x_profile_token)
+    profiles = profile_store.list()
+    return {
+        "profiles": profiles,
+        "count": len(profiles)
+    }
+
+@app.get("/profiles/{name}")
+async def get_profile_file(name: str, x_profile_token: Optional[str] = Header(default=None, alias=settings.PROFILE_HEADER)):
+    """Download one profile for flamegraph.pl or speedscope"""
+    check_profile_access(x_profile_token)
+    path = profile_store.path_for(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {name}")
+    return FileResponse(path, media_type="text/plain", filename=name)
+
+# Raw ASGI fast lane for the mostly-static routes (default tenant only; off while capturing)
+asgi_app = app
+if settings.FAST_LANE_ENABLED and not settings.CAPTURE_ENABLED:
+    fast_lane = FastLane(
+        app,
+        bypass_headers=[settings.TENANT_HEADER, settings.PROFILE_HEADER],
+        compression=settings.COMPRESSION_ENABLED,
+        compressor=compressor
+    )
+    fast_lane.static("GET", "/", lambda: root(tenant=default_tenant()))
+    fast_lane.static("GET", "/profile", lambda: get_full_profile(tenant=default_tenant()))
+    fast_lane.keyed("POST", "/quick-info", "info_type",
+                    lambda info_type: quick_info(QuickInfoRequest(info_type=info_type), tenant=default_tenant()))
+    fast_lane.dynamic("GET", "/health", health_check)
+    asgi_app = fast_lane
+
 # Vercel serverless function handler
-handler = app
+handler = asgi_app
@@ -0,0 +1,187 @@
+"""
+On-demand sampling profiler for individual requests
+A request is profiled when it carries the privileged token header or is picked by the
+sample rate; its thread's stack is sampled until it finishes and written as a
+collapsed-stack file (flamegraph.pl / speedscope compatible)
+Work the request hands to other threads is sampled too, once those functions are
+marked with @profiled_thread; their stacks are rooted at the thread's name
+"""
+import functools
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from config import settings
+
+PROFILE_SUFFIX = ".collapsed"
+NAME_PATTERN = re.compile(r"^profile-[\w.-]+\.collapsed$")
+
+# Threads working for the request being profiled, {thread id: name}; None when not profiling
+_request_threads: ContextVar[Optional[Dict[int, str]]] = ContextVar("profiled_threads", default=None)
+
+
+def profiled_thread(func):
+    """
+    Sample the calling thread while func runs, if the request it serves is being profiled
+    (contextvars reach worker threads via asyncio.to_thread or contextvars.copy_context().run)
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        threads = _request_threads.get()
+        ident = threading.get_ident()
+        if threads is None or ident in threads:
+            return func(*args, **kwargs)
+        threads[ident] = threading.current_thread().name
+        try:
+            return func(*args, **kwargs)
+        finally:
+            threads.pop(ident, None)
+    return wrapper
+
+
+def collapse_stack(frame) -> str:
+    """Root-first 'func (file:line);...' string for one stack"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    parts.reverse()
+    return ";".join(parts)
+
+
+class StackSampler:
+    """
+    Samples one thread's stack at a fixed interval from a helper thread, plus the threads
+    currently listed in `threads` (a live {thread id: name} dict), tagged with their name
+    """
+
+    def __init__(self, thread_id: int, interval: float, threads: Optional[Dict[int, str]] = None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.threads = threads if threads is not None else {}
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            frame = frames.get(self.thread_id)
+            if frame is not None:
+                self.samples[collapse_stack(frame)] += 1
+            for ident, name in list(self.threads.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples[f"{name};{collapse_stack(frame)}"] += 1
+
+
+class ProfileStore:
+    """Directory of collapsed-stack files, oldest removed beyond `keep`"""
+
+    def __init__(self, directory: Optional[str] = None, keep: Optional[int] = None):
+        self.directory = directory or settings.PROFILE_DIR
+        self.keep = keep or settings.PROFILE_KEEP
+
+    def save(self, method: str, path: str, samples: Counter, duration_ms: float) -> Optional[str]:
+        if not samples:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r"[^\w]+", "_", path).strip("_") or "root"
+        name = f"profile-{time.time_ns():020d}-{method.lower()}-{slug}-{int(duration_ms)}ms{PROFILE_SUFFIX}"
+        with open(os.path.join(self.directory, name), "w") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        self.rotate()
+        return name
+
+    def rotate(self):
+        names = self._names()
+        for name in names[: max(0, len(names) - self.keep)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _names(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(n for n in os.listdir(self.directory) if NAME_PATTERN.match(n))
+
+    def list(self) -> List[Dict]:
+        """Most recent profiles first"""
+        profiles = []
+        for name in reversed(self._names()):
+            full = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(full)
+            except FileNotFoundError:
+                continue
+            profiles.append({"name": name, "bytes": stat.st_size, "created": stat.st_mtime})
+        return profiles
+
+    def path_for(self, name: str) -> Optional[str]:
+        """Absolute path of a stored profile, None for unknown or unsafe names"""
+        if not NAME_PATTERN.match(name):
+            return None
+        full = os.path.join(self.directory, name)
+        return full if os.path.isfile(full) else None
+
+
+class ProfilingMiddleware:
+    """
+    Raw ASGI middleware so untriggered requests pay only a header scan and one random()
+    Only installed when PROFILE_TOKEN is set; without a token nothing triggers
+    """
+
+    def __init__(self, app, store: Optional[ProfileStore] = None, token: Optional[str] = None,
+                 sample_rate: Optional[float] = None, interval: Optional[float] = None):
+        self.app = app
+        self.store = store or ProfileStore()
+        self.token = (token if token is not None else settings.PROFILE_TOKEN).encode()
+        self.sample_rate = sample_rate if sample_rate is not None else settings.PROFILE_SAMPLE_RATE
+        self.interval = interval or settings.PROFILE_INTERVAL_SECONDS
+        self.header = settings.PROFILE_HEADER.lower().encode()
+
+    def _triggered(self, scope) -> bool:
+        if not self.token:
+            return False
+        for key, value in scope.get("headers", ()):
+            if key == self.header:
+                return hmac.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._triggered(scope):
+            await self.app(scope, receive, send)
+            return
+
+        threads: Dict[int, str] = {}
+        token = _request_threads.set(threads)
+        sampler = StackSampler(threading.get_ident(), self.interval, threads)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_threads.reset(token)
+            samples = sampler.stop()
+            try:
+                self.store.save(scope["method"], scope["path"], samples, (time.perf_counter() - start) * 1000)
+            except OSError as e:
+                print(f"⚠️ Could not save profile: {e}")
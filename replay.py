@@ -0,0 +1,245 @@
+"""
+Deterministic replay of captured traffic against the in-process app
+Plays a capture (see traffic.py) with a fake model at the original or an accelerated rate,
+reports latency percentiles per endpoint and diffs them against a stored baseline
+
+Usage:
+    python replay.py /tmp/anshul-capture --speed 10 --save-baseline baseline.json
+    python replay.py /tmp/anshul-capture --speed 10 --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from fake_model import FakeGenerativeModel, begin_request, lognormal_latency
+from journal import read_journal
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+async def asgi_request(
+    app,
+    method: str,
+    path: str,
+    query: str = "",
+    body: Optional[bytes] = None,
+    headers: Optional[List[Tuple[bytes, bytes]]] = None,
+) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    """Call an ASGI app directly, no server or HTTP client involved"""
+    body = body or b""
+    request_headers = list(headers or [])
+    if body:
+        request_headers.append((b"content-type", b"application/json"))
+        request_headers.append((b"content-length", str(len(body)).encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": request_headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    status = 500
+    response_headers: List[Tuple[bytes, bytes]] = []
+    chunks: List[bytes] = []
+
+    async def send(message):
+        nonlocal status, response_headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, response_headers, b"".join(chunks)
+
+
+def load_capture(directory: str) -> List[Dict]:
+    """Captured requests ordered by arrival time"""
+    entries = [e for e in read_journal(directory) if "path" in e]
+    entries.sort(key=lambda e: e["ts"])
+    return entries
+
+
+async def replay(app, entries: List[Dict], speed: float = 1.0) -> List[Dict]:
+    """
+    Fire each captured request at its original offset divided by speed (speed <= 0: back to back)
+    Latency is measured from the scheduled send time, so queueing behind a blocked
+    event loop counts against the request instead of being hidden
+    Each request carries its captured tenant, and its anonymized client key as
+    X-Forwarded-For, so rate limits and the fair queue tell the original callers apart
+    A fake model draws from a stream per entry index, so concurrent replays repeat
+    whatever order the worker threads run in
+    """
+    if not entries:
+        return []
+    origin = entries[0]["ts"]
+    loop_start = time.perf_counter()
+    results: List[Dict] = []
+
+    async def fire(index: int, entry: Dict, offset: float):
+        begin_request(index)
+        delay = offset - (time.perf_counter() - loop_start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        scheduled = loop_start + offset
+        body = json.dumps(entry["body"]).encode() if entry.get("body") is not None else None
+        headers = []
+        if entry.get("tenant"):
+            headers.append((settings.TENANT_HEADER.lower().encode(), entry["tenant"].encode()))
+        if entry.get("client"):
+            headers.append((b"x-forwarded-for", entry["client"].encode()))
+        status, _, _ = await asgi_request(app, entry["method"], entry["path"], entry.get("query", ""), body, headers)
+        results.append({
+            "endpoint": f"{entry['method']} {entry['path']}",
+            "status": status,
+            "latency_ms": (time.perf_counter() - max(scheduled, loop_start)) * 1000,
+        })
+
+    if speed <= 0:
+        for index, entry in enumerate(entries):
+            await fire(index, entry, 0.0)
+            loop_start = time.perf_counter()
+    else:
+        await asyncio.gather(*(fire(i, e, (e["ts"] - origin) / speed) for i, e in enumerate(entries)))
+    return results
+
+
+def summarize(results: List[Dict]) -> Dict[str, Dict]:
+    """Latency distribution per endpoint"""
+    by_endpoint: Dict[str, List[Dict]] = {}
+    for result in results:
+        by_endpoint.setdefault(result["endpoint"], []).append(result)
+
+    report = {}
+    for endpoint, items in sorted(by_endpoint.items()):
+        latencies = sorted(r["latency_ms"] for r in items)
+        summary = {"count": len(items), "errors": sum(1 for r in items if r["status"] >= 500)}
+        for q in PERCENTILES:
+            summary[f"p{q}_ms"] = round(percentile(latencies, q), 3)
+        summary["max_ms"] = round(latencies[-1], 3)
+        report[endpoint] = summary
+    return report
+
+
+def compare(report: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float = 0.2, floor_ms: float = 1.0) -> List[str]:
+    """
+    Percentiles that got slower than baseline by more than tolerance (relative)
+    Differences below floor_ms are ignored as noise
+    """
+    regressions = []
+    for endpoint, current in report.items():
+        previous = baseline.get(endpoint)
+        if previous is None:
+            continue
+        for q in PERCENTILES:
+            key = f"p{q}_ms"
+            before, after = previous.get(key, 0.0), current[key]
+            if after - before > floor_ms and after > before * (1 + tolerance):
+                regressions.append(f"{endpoint} {key}: {before:.1f} → {after:.1f} ms (+{(after / before - 1) * 100 if before else float('inf'):.0f}%)")
+    return regressions
+
+
+def run(capture_dir: str, speed: float, model: FakeGenerativeModel) -> Dict[str, Dict]:
+    """Replay a capture against main.app with the given fake model and return the report"""
+    import main
+    from agent import AnshulChatAgent
+
+    entries = load_capture(capture_dir)
+    agent = AnshulChatAgent(model=model)
+    originals = (main.get_agent, main.settings.RATE_LIMIT_ENABLED, main.settings.TRUST_PROXY_HEADERS)
+    main.get_agent = lambda: agent
+    # Replayed client keys arrive as X-Forwarded-For; captures made before client keys
+    # were recorded would put every request in one bucket, so they replay unlimited
+    main.settings.TRUST_PROXY_HEADERS = True
+    if not all(e.get("client") for e in entries):
+        main.settings.RATE_LIMIT_ENABLED = False
+    main.get_rate_limits.cache_clear()
+    main.sessions.clear()
+    try:
+        results = asyncio.run(replay(main.asgi_app, entries, speed))
+    finally:
+        main.get_agent, main.settings.RATE_LIMIT_ENABLED, main.settings.TRUST_PROXY_HEADERS = originals
+        main.get_rate_limits.cache_clear()
+        main.sessions.clear()
+    return summarize(results)
+
+
+def print_report(report: Dict[str, Dict]):
+    print(f"{'endpoint':<24}{'count':>7}{'errors':>8}" + "".join(f"{'p' + str(q):>10}" for q in PERCENTILES) + f"{'max':>10}")
+    for endpoint, s in report.items():
+        print(f"{endpoint:<24}{s['count']:>7}{s['errors']:>8}" + "".join(f"{s[f'p{q}_ms']:>10.1f}" for q in PERCENTILES) + f"{s['max_ms']:>10.1f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay captured traffic with a fake model")
+    parser.add_argument("capture_dir", help="Directory written by CAPTURE_ENABLED=true")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression factor, 0 = back to back")
+    parser.add_argument("--model-latency-ms", type=float, default=800.0, help="Median fake model latency")
+    parser.add_argument("--model-sigma", type=float, default=0.5, help="Lognormal spread of fake model latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="Baseline report to diff against")
+    parser.add_argument("--save-baseline", help="Write this run's report as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown per percentile")
+    args = parser.parse_args(argv)
+
+    model = FakeGenerativeModel(
+        latency=lognormal_latency(args.model_latency_ms / 1000, args.model_sigma),
+        seed=args.seed,
+    )
+    report = run(args.capture_dir, args.speed, model)
+    if not report:
+        print(f"❌ No captured requests found in {args.capture_dir}")
+        return 1
+
+    print_report(report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("\n❌ Latency regressions:")
+            for line in regressions:
+                print(f"   - {line}")
+            return 1
+        print("\n✅ No latency regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Compact binary encoding for session message lists
+Frame: magic (2 bytes) | version | flags | payload (optionally zlib/zstd compressed)
+Payload: varint message count, then per message a role byte and length-prefixed UTF-8 text
+Delta frames carry only what changed since the previous state: messages trimmed after
+the system prompt and messages appended, plus a CRC32 of the base they apply to
+"""
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency
+    zstandard = None
+
+MAGIC = b"\xa5S"
+VERSION = 2  # 2: delta frames carry a base fingerprint
+
+FLAG_ZLIB = 0x01
+FLAG_ZSTD = 0x02
+FLAG_DELTA = 0x04
+
+COMPRESS_MIN_BYTES = 256  # Smaller payloads rarely shrink
+
+ROLE_CODES = {"system": 0, "user": 1, "assistant": 2, "model": 3}
+ROLE_NAMES = {code: role for role, code in ROLE_CODES.items()}
+ROLE_OTHER = 0xFF  # Followed by the role name as length-prefixed UTF-8
+
+
+# ---------------------------------------------------------------------- varints
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated session snapshot")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_text(out: bytearray, text: str):
+    raw = text.encode("utf-8")
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _read_text(data: bytes, pos: int) -> Tuple[str, int]:
+    length, pos = _read_varint(data, pos)
+    end = pos + length
+    if end > len(data):
+        raise ValueError("Truncated session snapshot")
+    return data[pos:end].decode("utf-8"), end
+
+
+# ---------------------------------------------------------------------- messages
+
+def _write_messages(out: bytearray, messages: List[Dict]):
+    _write_varint(out, len(messages))
+    for message in messages:
+        if len(message) != 2 or "role" not in message or "content" not in message:
+            raise ValueError("Session messages must have exactly 'role' and 'content'")
+        role = message["role"]
+        code = ROLE_CODES.get(role)
+        if code is None:
+            out.append(ROLE_OTHER)
+            _write_text(out, role)
+        else:
+            out.append(code)
+        _write_text(out, message["content"])
+
+
+def _read_messages(data: bytes, pos: int) -> Tuple[List[Dict], int]:
+    count, pos = _read_varint(data, pos)
+    messages = []
+    for _ in range(count):
+        if pos >= len(data):
+            raise ValueError("Truncated session snapshot")
+        code = data[pos]
+        pos += 1
+        if code == ROLE_OTHER:
+            role, pos = _read_text(data, pos)
+        else:
+            role = ROLE_NAMES.get(code)
+            if role is None:
+                raise ValueError(f"Unknown role code: {code}")
+        content, pos = _read_text(data, pos)
+        messages.append({"role": role, "content": content})
+    return messages, pos
+
+
+def _fingerprint(messages: List[Dict]) -> bytes:
+    """CRC32 of the uncompressed payload encoding of a message list"""
+    out = bytearray()
+    _write_messages(out, messages)
+    return zlib.crc32(out).to_bytes(4, "big")
+
+
+# ---------------------------------------------------------------------- framing
+
+def _frame(payload: bytes, flags: int, compression: str) -> bytes:
+    if compression == "auto":
+        compression = "zstd" if zstandard is not None else "zlib"
+    if compression != "none" and len(payload) >= COMPRESS_MIN_BYTES:
+        if compression == "zstd":
+            if zstandard is None:
+                raise ValueError("zstd compression needs the zstandard package")
+            packed, flag = zstandard.ZstdCompressor(level=3).compress(payload), FLAG_ZSTD
+        elif compression == "zlib":
+            packed, flag = zlib.compress(payload, 6), FLAG_ZLIB
+        else:
+            raise ValueError(f"Unknown compression: {compression}")
+        if len(packed) < len(payload):
+            payload, flags = packed, flags | flag
+    return MAGIC + bytes((VERSION, flags)) + payload
+
+
+def _unframe(data: bytes) -> Tuple[int, bytes]:
+    if len(data) < 4 or data[:2] != MAGIC:
+        raise ValueError("Not a session snapshot")
+    if data[2] != VERSION:
+        raise ValueError(f"Unsupported session snapshot version: {data[2]}")
+    flags = data[3]
+    payload = data[4:]
+    if flags & FLAG_ZSTD:
+        if zstandard is None:
+            raise ValueError("Snapshot is zstd-compressed but zstandard is not installed")
+        try:
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Corrupt session snapshot: {e}")
+    elif flags & FLAG_ZLIB:
+        try:
+            payload = zlib.decompress(payload)
+        except zlib.error as e:
+            raise ValueError(f"Corrupt session snapshot: {e}")
+    return flags, payload
+
+
+# ---------------------------------------------------------------------- public API
+
+def encode_snapshot(messages: List[Dict], compression: str = "auto") -> bytes:
+    """
+    Full snapshot of a message list
+
+    Args:
+        compression: "none", "zlib", "zstd" or "auto" (zstd when installed, else zlib)
+    """
+    out = bytearray()
+    _write_messages(out, messages)
+    return _frame(bytes(out), 0, compression)
+
+
+def _diff(old: List[Dict], new: List[Dict]) -> Optional[Tuple[int, int, List[Dict]]]:
+    """
+    Express new as old[:head] + old[head + drop:] + appended, with head 0 or 1
+    (the agent keeps the system prompt and trims the oldest turns after it)
+    Returns the (head, drop, appended) with the fewest appended messages, or None
+    """
+    best = None
+    for head in (0, 1):
+        if head > len(old) or new[:head] != old[:head]:
+            continue
+        for drop in range(len(old) - head + 1):
+            kept = old[head + drop:]
+            if new[head:head + len(kept)] == kept:
+                appended = new[head + len(kept):]
+                if best is None or len(appended) < len(best[2]):
+                    best = (head, drop, appended)
+                break
+    return best
+
+
+def encode_delta(old: List[Dict], new: List[Dict], compression: str = "auto") -> bytes:
+    """
+    Frame that turns old into new; falls back to a full snapshot when new does not
+    reuse any of old's messages
+    """
+    change = _diff(old, new)
+    if change is None or len(change[2]) == len(new):
+        # Nothing of old survives, so a self-contained snapshot is just as small
+        return encode_snapshot(new, compression)
+    head, drop, appended = change
+    out = bytearray()
+    _write_varint(out, len(old))
+    _write_varint(out, head)
+    _write_varint(out, drop)
+    out += _fingerprint(old)
+    _write_messages(out, appended)
+    return _frame(bytes(out), FLAG_DELTA, compression)
+
+
+def decode(data: bytes, base: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    Decode a snapshot, or apply a delta frame to base
+
+    Raises:
+        ValueError: malformed frame, or a delta whose base does not match
+    """
+    flags, payload = _unframe(data)
+    if not flags & FLAG_DELTA:
+        messages, pos = _read_messages(payload, 0)
+    else:
+        base_len, pos = _read_varint(payload, 0)
+        head, pos = _read_varint(payload, pos)
+        drop, pos = _read_varint(payload, pos)
+        fingerprint = payload[pos:pos + 4]
+        pos += 4
+        if (base is None or len(base) != base_len or head + drop > base_len
+                or fingerprint != _fingerprint(base)):
+            raise ValueError("Delta does not apply to this session state")
+        appended, pos = _read_messages(payload, pos)
+        messages = base[:head] + base[head + drop:] + appended
+    if pos != len(payload):
+        raise ValueError("Trailing bytes in session snapshot")
+    return messages
+
+
+def replay_frames(frames: List[bytes]) -> List[Dict]:
+    """Rebuild a session from a snapshot followed by delta frames"""
+    messages: Optional[List[Dict]] = None
+    for frame in frames:
+        messages = decode(frame, messages)
+    return messages or []
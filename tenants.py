@@ -0,0 +1,230 @@
+"""
+Multi-tenant profile registry
+Tenant profiles are JSON/YAML files validated against AnshulProfile. Each one is loaded on
+first use and kept, with its rendered context and system prompt, in a memory-capped LRU,
+so cold start does not grow with the number of tenant files
+"""
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional
+
+from config import settings
+from pydantic import HttpUrl
+
+from profile_data import ANSHUL_PROFILE, AnshulProfile, ContactInfo, build_system_prompt
+
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+PROFILE_EXTENSIONS = (".json", ".yaml", ".yml")
+CONTEXT_SECTIONS = ("contact", "projects", "skills", "education", "experience", "achievements")
+
+
+class TenantNotFound(KeyError):
+    """No profile file exists for the requested tenant ID"""
+
+
+class TenantContactInfo(ContactInfo):
+    """ContactInfo without the built-in profile's details as defaults: every field is required"""
+    name: str
+    role: str
+    email: str
+    phone: str
+    portfolio: HttpUrl
+    github: HttpUrl
+    linkedin: HttpUrl
+
+
+class TenantProfile(AnshulProfile):
+    """Schema for tenant profile files"""
+    contact: TenantContactInfo
+
+
+def render_profile_context(profile: AnshulProfile, section: str) -> str:
+    """Profile information injected into the prompt for a routed intent"""
+    # Contact information
+    if section == "contact":
+        return f"""
+Contact Information:
+- Email: {profile.contact.email}
+- Phone: {profile.contact.phone}
+- Portfolio: {profile.contact.portfolio}
+- GitHub: {profile.contact.github}
+- LinkedIn: {profile.contact.linkedin}
+"""
+
+    # Projects
+    if section == "projects":
+        projects_info = "\n\n".join([
+            f"**{p.name}**\n{p.description}\n"
+            f"Demo: {p.demo_video}\nGitHub: {p.github}\nWebsite: {p.website}"
+            for p in profile.projects
+        ])
+        return f"Projects:\n{projects_info}"
+
+    # Skills
+    if section == "skills":
+        skills_info = "\n".join([
+            f"**{category}:** {', '.join(skills)}"
+            for category, skills in profile.technical_skills.items()
+        ])
+        return f"Technical Skills:\n{skills_info}"
+
+    # Education
+    if section == "education":
+        edu_info = "\n".join([
+            f"- {e.degree} at {e.institution} ({e.score}) | {e.period}"
+            for e in profile.education
+        ])
+        return f"Education:\n{edu_info}"
+
+    # Experience
+    if section == "experience":
+        exp_info = "\n".join([
+            f"**{e.title}** at {e.organization} ({e.period})\n" +
+            "\n".join([f"  • {r}" for r in e.responsibilities])
+            for e in profile.experience
+        ])
+        return f"Experience:\n{exp_info}"
+
+    # Achievements
+    if section == "achievements":
+        ach_info = "\n".join([f"• {a}" for a in profile.achievements])
+        return f"Achievements:\n{ach_info}"
+
+    return ""
+
+
+def load_profile_file(path: str) -> AnshulProfile:
+    """Parse and validate a tenant profile file (YAML needs PyYAML installed)"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if path.endswith(".json"):
+        data = json.loads(raw)
+    else:
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError(f"PyYAML is required to load {os.path.basename(path)}")
+        try:
+            data = yaml.safe_load(raw)
+        except yaml.YAMLError as e:
+            raise ValueError(f"{os.path.basename(path)} is not valid YAML: {e}")
+    if not isinstance(data, dict):
+        raise ValueError(f"{os.path.basename(path)} must contain a profile object")
+    return TenantProfile(**data)
+
+
+class TenantContext:
+    """Everything the agent needs for one tenant, rendered once at load"""
+
+    def __init__(self, tenant_id: str, profile: AnshulProfile, source_bytes: int = 0):
+        self.tenant_id = tenant_id
+        self.profile = profile
+        self.system_prompt = build_system_prompt(profile)
+        self.contexts: Dict[str, str] = {
+            section: render_profile_context(profile, section) for section in CONTEXT_SECTIONS
+        }
+        # Approximate footprint: parsed models are ~2x their source, plus rendered text
+        self.size_bytes = (
+            2 * source_bytes
+            + len(self.system_prompt)
+            + sum(len(c) for c in self.contexts.values())
+        )
+
+    def get_context(self, intent: str) -> str:
+        return self.contexts.get(intent, "")
+
+    def get_quick_info(self, info_type: str) -> Optional[Dict]:
+        profile = self.profile
+        info_map = {
+            "contact": lambda: profile.contact.dict(),
+            "projects": lambda: [p.dict() for p in profile.projects],
+            "skills": lambda: profile.technical_skills,
+            "education": lambda: [e.dict() for e in profile.education],
+            "experience": lambda: [e.dict() for e in profile.experience],
+            "achievements": lambda: profile.achievements,
+            "summary": lambda: profile.summary,
+        }
+        builder = info_map.get(info_type)
+        return builder() if builder else None
+
+
+@lru_cache()
+def default_tenant() -> TenantContext:
+    """The built-in profile from profile_data.py"""
+    return TenantContext(settings.DEFAULT_TENANT_ID, ANSHUL_PROFILE)
+
+
+class TenantRegistry:
+    """
+    Lazy, LRU-cached tenant lookup by ID
+    - Nothing is read at construction; a tenant's file is loaded on its first request
+    - Least recently used tenants are evicted once the cache exceeds max_bytes
+    - The default tenant is always served from profile_data.py and never cached
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.directory = directory or settings.TENANT_DIR
+        self.max_bytes = max_bytes or settings.TENANT_CACHE_MAX_BYTES
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.cached_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, tenant_id: Optional[str] = None) -> TenantContext:
+        """
+        Raises:
+            TenantNotFound: unknown or malformed tenant ID
+            ValueError: the tenant's profile file is invalid
+        """
+        if not tenant_id or tenant_id == settings.DEFAULT_TENANT_ID:
+            return default_tenant()
+
+        with self._lock:
+            tenant = self._cache.get(tenant_id)
+            if tenant is not None:
+                self._cache.move_to_end(tenant_id)
+                self.hits += 1
+                return tenant
+
+        tenant = self._load(tenant_id)
+
+        with self._lock:
+            existing = self._cache.get(tenant_id)
+            if existing is not None:
+                return existing
+            self.misses += 1
+            self._cache[tenant_id] = tenant
+            self.cached_bytes += tenant.size_bytes
+            while self.cached_bytes > self.max_bytes and len(self._cache) > 1:
+                _, evicted = self._cache.popitem(last=False)
+                self.cached_bytes -= evicted.size_bytes
+                self.evictions += 1
+        return tenant
+
+    def _load(self, tenant_id: str) -> TenantContext:
+        if not TENANT_ID_PATTERN.match(tenant_id):
+            raise TenantNotFound(tenant_id)
+        for extension in PROFILE_EXTENSIONS:
+            path = os.path.join(self.directory, tenant_id + extension)
+            try:
+                source_bytes = os.path.getsize(path)
+            except OSError:
+                continue
+            return TenantContext(tenant_id, load_profile_file(path), source_bytes)
+        raise TenantNotFound(tenant_id)
+
+    def stats(self) -> Dict:
+        return {
+            "cached": len(self._cache),
+            "cached_bytes": self.cached_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,104 @@
+"""
+Tests for negotiated response compression
+Run with pytest or directly: python test_compression.py
+"""
+import asyncio
+import gzip
+import json
+
+import pytest
+
+import main
+from agent import AnshulChatAgent
+from compression import ENCODINGS, AdaptiveCompressor, StaticBody, choose_encoding
+from fake_model import FakeGenerativeModel
+from replay import asgi_request
+
+LONG_REPLY = " ".join(f"Anshul built project {i} with FastAPI and LangChain." for i in range(100))
+
+
+def decode_body(headers, body):
+    encoding = dict(headers).get(b"content-encoding")
+    if encoding == b"gzip":
+        return gzip.decompress(body)
+    if encoding == b"br":
+        import brotli
+        return brotli.decompress(body)
+    assert encoding is None
+    return body
+
+
+def test_choose_encoding():
+    assert choose_encoding(None) is None
+    assert choose_encoding(b"identity") is None
+    assert choose_encoding(b"gzip, deflate") == "gzip"
+    assert choose_encoding(b"gzip;q=0") is None
+    assert choose_encoding(b"*;q=0.5, gzip;q=0") == ("br" if "br" in ENCODINGS else None)
+    if "br" in ENCODINGS:
+        assert choose_encoding(b"gzip, deflate, br") == "br"
+        assert choose_encoding(b"gzip;q=1, br;q=0.5") == "gzip"
+
+
+def test_static_body_variants():
+    """Large bodies are pre-compressed per encoding, small ones never"""
+    big = StaticBody(LONG_REPLY.encode())
+    assert set(big.variants) == set(ENCODINGS)
+    body, encoding = big.select(b"gzip")
+    assert encoding == "gzip" and gzip.decompress(body) == big.identity
+    assert big.select(None) == (big.identity, None)
+
+    small = StaticBody(b'{"ok":true}')
+    assert not small.compressible and small.variants == {}
+    assert small.select(b"gzip") == (small.identity, None)
+
+
+def test_adaptive_level_fits_budget():
+    """Bigger bodies get cheaper levels under the same budget"""
+    compressor = AdaptiveCompressor(budget_ms=1.0)
+    assert compressor.pick_level("gzip", 1_000) == 9
+    assert compressor.pick_level("gzip", 10_000_000) == 1
+    payload = LONG_REPLY.encode()
+    for _ in range(5):
+        assert gzip.decompress(compressor.compress(payload, "gzip")) == payload
+
+
+def test_chat_compressed_above_threshold(app_env):
+    """Long /chat replies are compressed when negotiated; short ones are not"""
+    for reply, expect_encoded in [(LONG_REPLY, True), ("Short answer.", False)]:
+        app_env.use_agent(AnshulChatAgent(model=FakeGenerativeModel(reply=reply)))
+        request = json.dumps({"message": "Tell me about his projects", "session_id": "compression-test"}).encode()
+        for accept in ENCODINGS:
+            status, headers, body = asyncio.run(asgi_request(
+                main.asgi_app, "POST", "/chat", body=request,
+                headers=[(b"accept-encoding", accept.encode())]))
+            assert status == 200
+            header_map = dict(headers)
+            assert (b"content-encoding" in header_map) == expect_encoded
+            assert int(header_map[b"content-length"]) == len(body)
+            assert json.loads(decode_body(headers, body))["response"] == reply
+
+
+def test_fast_lane_serves_precompressed_profile():
+    """/profile variants decode to the same bytes FastAPI would send uncompressed"""
+    _, _, plain = asyncio.run(asgi_request(main.app, "GET", "/profile"))
+    for accept in ENCODINGS:
+        for app in (main.app, main.asgi_app):
+            _, headers, body = asyncio.run(asgi_request(app, "GET", "/profile",
+                                                        headers=[(b"accept-encoding", accept.encode())]))
+            assert dict(headers)[b"content-encoding"] == accept.encode()
+            assert dict(headers)[b"vary"] == b"Accept-Encoding"
+            assert decode_body(headers, body) == plain
+
+
+def test_vary_merges_with_cors():
+    """Credentialed CORS responses carry a single Vary header naming both"""
+    headers = [(b"origin", b"https://example.com"), (b"cookie", b"a=b"), (b"accept-encoding", b"gzip")]
+    for app in (main.app, main.asgi_app):
+        _, response_headers, _ = asyncio.run(asgi_request(app, "GET", "/profile", headers=headers))
+        vary = [value for key, value in response_headers if key == b"vary"]
+        assert vary == [b"Origin, Accept-Encoding"]
+
+
+if __name__ == "__main__":
+    print("🧪 Testing response compression...")
+    raise SystemExit(pytest.main(["-q", __file__]))
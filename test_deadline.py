@@ -0,0 +1,116 @@
+"""
+Tests for deadline propagation and hedged LLM requests
+Uses a fake model with a heavy latency tail; run with pytest or: python test_deadline.py
+"""
+import asyncio
+import json
+import time
+
+import pytest
+
+from agent import AnshulChatAgent
+from deadline import Deadline, DeadlineExceeded
+from fake_model import FakeGenerativeModel, bimodal_latency, constant_latency
+from replay import asgi_request, percentile
+
+
+def make_agent(latency, hedge: bool = False, seed: int = 0) -> AnshulChatAgent:
+    agent = AnshulChatAgent(model=FakeGenerativeModel(latency=latency, seed=seed))
+    agent.min_model_seconds = 0.01
+    agent.deadline_reserve = 0.005
+    agent.hedge_enabled = hedge
+    agent.latency.min_samples = 10
+    return agent
+
+
+def test_slow_model_degrades_before_deadline():
+    """A call that would overrun is abandoned and the profile fast path answers"""
+    agent = make_agent(constant_latency(0.5))
+    start = time.monotonic()
+    try:
+        agent.chat("How can I contact him?", deadline=Deadline.after(0.1))
+        raise AssertionError("expected DeadlineExceeded")
+    except DeadlineExceeded as e:
+        assert "anshulnparate@gmail.com" in e.fallback
+    assert time.monotonic() - start < 0.2
+    assert agent.degraded == 1
+
+
+def test_near_expired_deadline_skips_model():
+    """With too little budget left the model is never called"""
+    agent = make_agent(constant_latency(0.0))
+    agent.min_model_seconds = 1.0
+    try:
+        agent.chat("Tell me about his projects", deadline=Deadline.after(0.5))
+        raise AssertionError("expected DeadlineExceeded")
+    except DeadlineExceeded as e:
+        assert "Projects" in e.fallback
+    assert agent.model.calls == 0
+
+
+def test_fallback_prefers_cached_answer():
+    """A profile question answered earlier is served from the answer cache when degraded"""
+    agent = make_agent(constant_latency(0.0))
+    answer, _ = agent.chat("What skills does he have?", deadline=Deadline.after(1.0))
+    agent.model.latency = constant_latency(0.5)
+    try:
+        agent.chat("  what SKILLS   does he have? ", deadline=Deadline.after(0.05))
+        raise AssertionError("expected DeadlineExceeded")
+    except DeadlineExceeded as e:
+        assert e.fallback == answer
+
+
+def test_context_dependent_answers_not_shared():
+    """Replies to general follow-ups are never cached, so no session sees another's"""
+    agent = make_agent(constant_latency(0.0))
+    agent.model.reply = "You just told me your name is Priya."
+    agent.chat("What did I just say?", deadline=Deadline.after(1.0))
+    assert agent.answer_cache == {}
+    agent.model.latency = constant_latency(0.5)
+    try:
+        agent.chat("What did I just say?", deadline=Deadline.after(0.05))
+        raise AssertionError("expected DeadlineExceeded")
+    except DeadlineExceeded as e:
+        assert "Priya" not in e.fallback
+
+
+def test_hedging_cuts_tail_latency():
+    """Once p95 is known, a second request rescues calls stuck in the slow mode"""
+    tail = bimodal_latency(fast=0.005, slow=0.2, slow_fraction=0.03)
+
+    def run(agent):
+        timings = []
+        for _ in range(150):
+            start = time.monotonic()
+            agent.chat("Hi", deadline=Deadline.after(5.0))
+            timings.append(time.monotonic() - start)
+        return sorted(timings[20:])
+
+    plain = run(make_agent(tail, hedge=False, seed=7))
+    hedged_agent = make_agent(tail, hedge=True, seed=7)
+    hedged = run(hedged_agent)
+
+    assert hedged_agent.hedges_sent > 0
+    assert hedged_agent.hedges_won > 0
+    assert percentile(plain, 99) >= 0.2
+    assert percentile(hedged, 99) < 0.1
+
+
+def test_chat_endpoint_reports_degraded(app_env):
+    """The deadline header reaches the agent and the response is flagged degraded"""
+    import main
+
+    app_env.use_agent(make_agent(constant_latency(0.5)))
+    body = json.dumps({"message": "What are his skills?", "session_id": "deadline-test"}).encode()
+    status, _, raw = asyncio.run(asgi_request(main.app, "POST", "/chat", body=body,
+                                              headers=[(b"x-request-deadline-ms", b"50")]))
+    data = json.loads(raw)
+    assert status == 200
+    assert data["degraded"] is True
+    assert data["message_count"] == 0
+    assert "Technical Skills" in data["response"]
+
+
+if __name__ == "__main__":
+    print("🧪 Testing deadlines and hedging...")
+    raise SystemExit(pytest.main(["-q", __file__]))
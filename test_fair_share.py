@@ -0,0 +1,218 @@
+"""
+Tests for per-client token buckets and the fair queue in front of the model
+Run with pytest or directly: python test_fair_share.py
+"""
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+import main
+from agent import AnshulChatAgent
+from deadline import Deadline
+from fair_share import FairQueue, TokenBuckets, acquire_all
+from fake_model import FakeGenerativeModel, bimodal_latency, constant_latency
+from replay import asgi_request
+
+
+def test_token_bucket_burst_then_refill():
+    buckets = TokenBuckets(rate=2.0, burst=3)
+    assert [buckets.acquire("a", now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.acquire("a", now=0.0) == 0.5
+    assert buckets.acquire("b", now=0.0) == 0.0  # Other clients are unaffected
+    assert buckets.acquire("a", now=0.5) == 0.0
+    assert buckets.stats()["limited"] == 1
+
+
+def test_acquire_all_debits_only_when_every_bucket_allows():
+    """A message the session bucket rejects leaves the IP's tokens for its other sessions"""
+    ip, session = TokenBuckets(rate=1.0, burst=3), TokenBuckets(rate=1.0, burst=1)
+    assert acquire_all([(ip, "a"), (session, "a|s1")], now=0.0) == 0.0
+    for _ in range(5):
+        assert acquire_all([(ip, "a"), (session, "a|s1")], now=0.0) == 1.0
+    assert acquire_all([(ip, "a"), (session, "a|s2")], now=0.0) == 0.0
+    assert acquire_all([(ip, "a"), (session, "a|s3")], now=0.0) == 0.0
+    assert acquire_all([(ip, "a"), (session, "a|s4")], now=0.0) == 1.0
+    assert ip.stats() == {"clients": 1, "allowed": 3, "limited": 1}
+    assert session.stats() == {"clients": 4, "allowed": 3, "limited": 5}
+
+
+def test_idle_buckets_expire():
+    """A bucket idle long enough to refill is dropped; max_clients bounds the table"""
+    buckets = TokenBuckets(rate=1.0, burst=2, max_clients=100)
+    for i in range(50):
+        buckets.acquire(f"client-{i}", now=0.0)
+    assert len(buckets) == 50
+    buckets.acquire("late", now=2.0)
+    assert len(buckets) == 1
+    for i in range(500):
+        buckets.acquire(f"churn-{i}", now=3.0)
+    assert len(buckets) == 100
+
+
+def run_contended(queue: FairQueue, clients):
+    """Hold the only slot, queue the given clients in order, then let them drain"""
+    order = []
+    assert queue.acquire("holder")
+
+    def worker(client, weight):
+        assert queue.acquire(client, weight=weight)
+        order.append(client)
+        queue.release()
+
+    threads = []
+    for client, weight in clients:
+        thread = threading.Thread(target=worker, args=(client, weight))
+        thread.start()
+        threads.append(thread)
+        while queue.stats()["waiting"] < len(threads):
+            time.sleep(0.001)
+    queue.release()
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_fair_queue_interleaves_clients():
+    """A quiet client arriving behind a noisy backlog is served next, not last"""
+    order = run_contended(FairQueue(1), [("noisy", 1.0)] * 5 + [("quiet", 1.0)])
+    assert order.index("quiet") == 1
+
+
+def test_fair_queue_weights():
+    """Backlogged clients are served in proportion to their weights"""
+    order = run_contended(FairQueue(1), [("heavy", 2.0)] * 6 + [("light", 1.0)] * 6)
+    assert order[:6].count("heavy") == 4
+
+
+def test_fair_queue_timeout():
+    queue = FairQueue(1)
+    assert queue.acquire("a")
+    assert queue.acquire("b", timeout=0.01) is None
+    queue.release()
+    assert queue.acquire("c", timeout=0.01)
+    assert queue.stats() == {"active": 1, "waiting": 0, "granted": 2, "timeouts": 1}
+
+
+def test_async_waiters_hold_no_threads():
+    """Hundreds of queued coroutines wait on the event loop and are served fairly"""
+    queue = FairQueue(2)
+    order = []
+
+    async def request(client):
+        slot = await queue.acquire_async(client)
+        order.append(client)
+        await asyncio.sleep(0.001)
+        slot.done()
+
+    async def scenario():
+        threads_before = threading.active_count()
+        tasks = [asyncio.create_task(request("noisy")) for _ in range(200)]
+        await asyncio.sleep(0.005)
+        tasks.append(asyncio.create_task(request("quiet")))
+        await asyncio.sleep(0)
+        arrived.append(len(order))
+        assert threading.active_count() == threads_before
+        await asyncio.gather(*tasks)
+
+    arrived = []
+    asyncio.run(scenario())
+    assert order.index("quiet") - arrived[0] <= 3
+    assert queue.stats()["active"] == 0
+
+
+def test_slot_held_by_abandoned_and_hedged_calls():
+    """A slot is only freed once every upstream call attached to it has returned"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    queue = FairQueue(2)
+    gate = threading.Event()
+    with ThreadPoolExecutor(2) as pool:
+        slot = queue.acquire("a")
+        slot.attach(pool.submit(gate.wait))
+        hedge = queue.try_acquire("a")
+        assert hedge is not None and queue.try_acquire("b") is None
+        hedge.attach(pool.submit(gate.wait))
+        hedge.done()
+        slot.done()  # The caller gave up; both calls are still running
+        assert queue.stats()["active"] == 2
+        gate.set()
+    assert queue.stats()["active"] == 0
+
+
+def test_agent_counts_hedges_against_queue():
+    """With every slot busy a slow call is not hedged, so upstream calls never exceed the limit"""
+    agent = AnshulChatAgent(model=FakeGenerativeModel(latency=bimodal_latency(0.002, 0.1, 0.05), seed=3))
+    agent.fair_queue = FairQueue(1)
+    agent.hedge_enabled = True
+    agent.min_model_seconds = 0.01
+    agent.latency.min_samples = 10
+    for _ in range(60):
+        agent.chat("Hi", deadline=Deadline.after(5.0))
+    assert agent.hedges_sent == 0
+    assert agent.fair_queue.stats()["active"] == 0
+
+    agent.fair_queue = FairQueue(2)
+    for _ in range(60):
+        agent.chat("Hi", deadline=Deadline.after(5.0))
+    assert agent.hedges_sent > 0
+
+
+def test_chat_rate_limited_per_session_and_ip(app_env):
+    """Past the session burst /chat answers 429 with Retry-After; other sessions still pass"""
+    app_env.use_agent()
+    app_env.set(RATE_LIMIT_ENABLED=True, TRUST_PROXY_HEADERS=True)
+    ip = [(b"x-forwarded-for", b"10.0.0.1, 203.0.113.7")]
+
+    def send(session_id):
+        body = json.dumps({"message": "Hi", "session_id": session_id}).encode()
+        return asyncio.run(asgi_request(main.asgi_app, "POST", "/chat", body=body, headers=ip))
+
+    statuses = [send("rate-test")[0] for _ in range(main.settings.RATE_LIMIT_SESSION_BURST)]
+    assert statuses == [200] * main.settings.RATE_LIMIT_SESSION_BURST
+    status, headers, _ = send("rate-test")
+    assert status == 429
+    assert int(dict(headers)[b"retry-after"]) >= 1
+    assert send("rate-test-2")[0] == 200
+    assert main.get_rate_limits()["ip"].stats()["clients"] == 1
+
+
+def test_forwarded_for_cannot_dodge_limits(app_env):
+    """Client-chosen X-Forwarded-For values share the socket peer's bucket unless proxies are trusted"""
+    app_env.use_agent()
+    app_env.set(RATE_LIMIT_ENABLED=True, TRUST_PROXY_HEADERS=False)
+
+    def send(forwarded):
+        body = json.dumps({"message": "Hi", "session_id": "spoof-test"}).encode()
+        headers = [(b"x-forwarded-for", forwarded.encode())]
+        return asyncio.run(asgi_request(main.asgi_app, "POST", "/chat", body=body, headers=headers))[0]
+
+    statuses = [send(f"192.0.2.{i}") for i in range(main.settings.RATE_LIMIT_SESSION_BURST + 1)]
+    assert statuses[-1] == 429
+
+    # Behind a trusted proxy only the hop it appended counts, not what the client prepended
+    app_env.set(TRUST_PROXY_HEADERS=True)
+    statuses = [send(f"192.0.2.{i}, 198.51.100.9") for i in range(main.settings.RATE_LIMIT_SESSION_BURST + 1)]
+    assert statuses[-1] == 429
+
+
+def test_concurrent_turns_on_one_session_are_serialized(app_env):
+    """Simultaneous messages on a session all land in its history, one turn after another"""
+    app_env.use_agent(AnshulChatAgent(model=FakeGenerativeModel(latency=constant_latency(0.02))))
+
+    async def send_all():
+        requests = [json.dumps({"message": f"m{i}", "session_id": "race"}).encode() for i in range(3)]
+        return await asyncio.gather(*[asgi_request(main.asgi_app, "POST", "/chat", body=body) for body in requests])
+
+    results = asyncio.run(send_all())
+    assert [status for status, _, _ in results] == [200] * 3
+    assert sorted(json.loads(body)["message_count"] for _, _, body in results) == [2, 4, 6]
+    users = [m["content"] for m in main.sessions[f"{main.settings.DEFAULT_TENANT_ID}:race"].messages if m["role"] == "user"]
+    assert sorted(users) == ["m0", "m1", "m2"]
+
+
+if __name__ == "__main__":
+    print("🧪 Testing fair share admission control...")
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,70 @@
+"""
+Tests for the raw ASGI fast lane
+Fast-lane responses must match what FastAPI would have sent
+Run with pytest or directly: python test_fast_lane.py
+"""
+import asyncio
+import json
+
+import pytest
+
+import main
+from fast_lane import FastLane
+from replay import asgi_request
+
+ORIGIN = [(b"origin", b"https://example.com")]
+
+
+def both(method, path, body=None, headers=None):
+    """The same request through FastAPI alone and through the fast lane"""
+    slow = asyncio.run(asgi_request(main.app, method, path, body=body, headers=headers))
+    fast = asyncio.run(asgi_request(main.asgi_app, method, path, body=body, headers=headers))
+    return slow, fast
+
+
+def test_fast_lane_is_installed():
+    assert isinstance(main.asgi_app, FastLane)
+
+
+def test_static_routes_match_fastapi(app_env):
+    """Bodies, status and CORS headers are identical to the FastAPI stack"""
+    requests = [("GET", "/", None), ("GET", "/profile", None)] + [
+        ("POST", "/quick-info", json.dumps({"info_type": t}).encode())
+        for t in ["contact", "projects", "skills", "education", "experience", "achievements", "summary"]
+    ]
+    for method, path, body in requests:
+        for headers in [None, ORIGIN, ORIGIN + [(b"cookie", b"a=b")]]:
+            (slow_status, slow_headers, slow_body), (fast_status, fast_headers, fast_body) = both(method, path, body, headers)
+            assert (fast_status, fast_body) == (slow_status, slow_body), path
+            assert sorted(fast_headers) == sorted(slow_headers), path
+
+
+def test_health_is_dynamic(app_env):
+    """Health is rebuilt per request and reflects live session counts"""
+    main.sessions["fast-lane-test"] = main.SessionData()
+    status, _, body = asyncio.run(asgi_request(main.asgi_app, "GET", "/health"))
+    assert status == 200
+    assert json.loads(body)["active_sessions"] == 1
+    del main.sessions["fast-lane-test"]
+    _, _, body = asyncio.run(asgi_request(main.asgi_app, "GET", "/health"))
+    assert json.loads(body)["active_sessions"] == 0
+
+
+def test_unhandled_requests_pass_through(app_env):
+    """Bad bodies, tenant headers and preflights get FastAPI's own responses"""
+    cases = [
+        ("POST", "/quick-info", json.dumps({"info_type": "nope"}).encode(), None),
+        ("POST", "/quick-info", b"not json", None),
+        ("POST", "/quick-info", json.dumps({"info_type": 3}).encode(), None),
+        ("GET", "/profile", None, [(b"x-tenant-id", b"ghost")]),
+        ("OPTIONS", "/profile", None, ORIGIN + [(b"access-control-request-method", b"GET")]),
+    ]
+    for method, path, body, headers in cases:
+        (slow_status, _, slow_body), (fast_status, _, fast_body) = both(method, path, body, headers)
+        assert fast_status == slow_status
+        assert fast_body == slow_body
+
+
+if __name__ == "__main__":
+    print("🧪 Testing ASGI fast lane...")
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,73 @@
+"""
+Tests for intent-adaptive generation limits
+Checks the routed intent's config and brevity line actually reach the model
+Run with pytest or directly: python test_generation.py
+"""
+import pytest
+
+from agent import AnshulChatAgent
+from config import settings
+from fake_model import FakeGenerativeModel
+
+
+def test_intent_config_reaches_model():
+    """A contact question is sent with the contact profile's limits and brevity line"""
+    agent = AnshulChatAgent(model=FakeGenerativeModel())
+    agent.adaptive_generation = True
+    agent.chat("What's his email?")
+    profile = settings.GENERATION_PROFILES["contact"]
+    request = agent.model.last_request
+    assert request["generation_config"] == {"temperature": 0.2, "max_output_tokens": 256}
+    assert request["generation_config"]["max_output_tokens"] == profile["max_output_tokens"]
+    assert profile["brevity"] in request["content"]
+
+    agent.chat("Walk me through the RAG project")
+    request = agent.model.last_request
+    assert request["generation_config"]["max_output_tokens"] == settings.GENERATION_PROFILES["projects"]["max_output_tokens"]
+    assert settings.GENERATION_PROFILES["projects"]["brevity"] in request["content"]
+
+
+def test_mixed_intents_take_the_larger_budget():
+    """A question matching several intents is routed to the one with the largest token cap"""
+    agent = AnshulChatAgent(model=FakeGenerativeModel())
+    assert agent.classify_intent("What's on his GitHub?") == "contact"
+    assert agent.classify_intent("Tell me about his GitHub projects") == "projects"
+    assert agent.classify_intent("Which skills did that job need?") == "experience"
+
+
+def test_thinking_budget_exhaustion_retries_at_full_cap():
+    """An empty reply stopped at MAX_TOKENS is asked again with GEMINI_MAX_OUTPUT_TOKENS"""
+    agent = AnshulChatAgent(model=FakeGenerativeModel(thinking_tokens=300))
+    agent.adaptive_generation = True
+    response, _ = agent.chat("What's his email?")
+    assert response == agent.model.reply
+    assert agent.model.calls == 2
+    assert agent.budget_retries == 1
+    assert agent.model.last_request["generation_config"]["max_output_tokens"] == settings.GEMINI_MAX_OUTPUT_TOKENS
+
+    agent.chat("Walk me through the RAG project")
+    assert agent.model.calls == 3
+
+    agent.model.thinking_tokens = settings.GEMINI_MAX_OUTPUT_TOKENS
+    try:
+        agent.chat("What's his email?")
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+
+
+def test_adaptive_generation_off_restores_defaults(app_env):
+    """ADAPTIVE_GENERATION=false sends the fixed config and no brevity line for every intent"""
+    app_env.set(ADAPTIVE_GENERATION=False)
+    agent = AnshulChatAgent(model=FakeGenerativeModel())
+    for message in ["What's his email?", "Walk me through the RAG project", "Hi!"]:
+        agent.chat(message)
+        request = agent.model.last_request
+        assert request["generation_config"] == {"temperature": 0.7, "max_output_tokens": 2048}
+        assert not any(p["brevity"] and p["brevity"] in request["content"]
+                       for p in settings.GENERATION_PROFILES.values())
+
+
+if __name__ == "__main__":
+    print("🧪 Testing adaptive generation...")
+    raise SystemExit(pytest.main(["-q", __file__]))
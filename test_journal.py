@@ -0,0 +1,127 @@
+"""
+Tests for the write-behind conversation journal
+Run with pytest or directly: python test_journal.py
+"""
+import os
+import tempfile
+
+from journal import ConversationJournal, read_journal, OPEN_SUFFIX, SEALED_SUFFIX
+
+
+def test_record_and_flush():
+    """Queued turns end up in a sealed segment after close()"""
+    with tempfile.TemporaryDirectory() as directory:
+        journal = ConversationJournal(directory=directory, flush_interval=0.05)
+        journal.start()
+        for i in range(100):
+            assert journal.record(f"s{i % 3}", f"message {i}", f"response {i}")
+        journal.close()
+
+        records = list(read_journal(directory))
+        assert [r["message"] for r in records] == [f"message {i}" for i in range(100)]
+        assert journal.stats()["flushed"] == 100
+        assert all(n.endswith(SEALED_SUFFIX) for n in os.listdir(directory))
+
+
+def test_bounded_queue_drops():
+    """A full queue drops new turns and counts them instead of blocking"""
+    with tempfile.TemporaryDirectory() as directory:
+        journal = ConversationJournal(directory=directory, queue_size=10)
+        results = [journal.record("s", "m", "r") for _ in range(15)]
+        assert results.count(False) == 5
+        assert journal.stats()["dropped"] == 5
+        assert journal.flush() == 10
+
+
+def test_segment_rotation():
+    """Segments are sealed once they exceed the size cap"""
+    with tempfile.TemporaryDirectory() as directory:
+        journal = ConversationJournal(directory=directory, segment_max_bytes=200)
+        for i in range(10):
+            journal.record("s", f"message {i}", "x" * 50)
+            journal.flush()
+        journal.close()
+
+        assert journal.segments_sealed > 1
+        assert len(list(read_journal(directory))) == 10
+
+
+class FailingSegment:
+    """Writes the first few bytes of each write to the real segment, then fails like a full disk"""
+
+    def __init__(self, segment):
+        self.segment = segment
+
+    def write(self, data):
+        self.segment.write(data[:10])
+        self.segment.flush()
+        raise OSError("No space left on device")
+
+    def close(self):
+        self.segment.close()
+
+
+def test_failed_write_requeues_batch():
+    """A batch that fails to write is kept, and the torn bytes are cut from the segment"""
+    with tempfile.TemporaryDirectory() as directory:
+        journal = ConversationJournal(directory=directory)
+        journal.record("s", "message 0", "response 0")
+        journal.flush()
+        for i in range(1, 4):
+            journal.record("s", f"message {i}", f"response {i}")
+        journal._segment = FailingSegment(journal._segment)
+        try:
+            journal.flush()
+            raise AssertionError("expected OSError")
+        except OSError:
+            pass
+        stats = journal.stats()
+        assert (stats["pending"], stats["flushed"], stats["write_errors"], stats["dropped"]) == (3, 1, 1, 0)
+
+        journal.record("s", "message 4", "response 4")
+        assert journal.flush() == 4
+        journal.close()
+        journal.start()
+        journal.close()
+        assert [r["message"] for r in read_journal(directory)] == [f"message {i}" for i in range(5)]
+        assert all(n.endswith(SEALED_SUFFIX) for n in os.listdir(directory))
+
+
+def test_crash_recovery():
+    """An open segment with a torn last line is repaired and sealed on start()"""
+    with tempfile.TemporaryDirectory() as directory:
+        crashed = ConversationJournal(directory=directory)
+        for i in range(5):
+            crashed.record("s", f"message {i}", f"response {i}")
+        crashed.flush()
+        # Simulate a crash mid-write: no close(), partial record at the tail
+        crashed._segment.write(b'{"ts": 1, "session_id": "s", "mess')
+        crashed._segment.flush()
+        torn_path = crashed._segment_path
+        crashed._segment.close()
+        # A dead pid so recovery treats the segment as orphaned
+        dead_name = os.path.basename(torn_path).split("-")
+        dead_name[2] = "999999999"
+        orphan = os.path.join(directory, "-".join(dead_name))
+        os.replace(torn_path, orphan)
+
+        journal = ConversationJournal(directory=directory, flush_interval=0.05)
+        journal.start()
+        journal.record("s", "after restart", "ok")
+        journal.close()
+
+        assert journal.recovered_segments == 1
+        assert not any(n.endswith(OPEN_SUFFIX) for n in os.listdir(directory))
+        with open(orphan[: -len(OPEN_SUFFIX)] + SEALED_SUFFIX, "rb") as f:
+            assert f.read().endswith(b"\n")
+        messages = [r["message"] for r in read_journal(directory)]
+        assert messages == [f"message {i}" for i in range(5)] + ["after restart"]
+
+
+if __name__ == "__main__":
+    print("🧪 Testing conversation journal...")
+    for test in [test_record_and_flush, test_bounded_queue_drops, test_segment_rotation,
+                 test_failed_write_requeues_batch, test_crash_recovery]:
+        test()
+        print(f"   ✅ {test.__name__}")
+    print("\n🎉 All journal tests passed!")
@@ -0,0 +1,121 @@
+"""
+Tests for the on-demand request profiler
+Run with pytest or directly: python test_profiler.py
+"""
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+
+from profiler import ProfileStore, ProfilingMiddleware, StackSampler
+from replay import asgi_request
+
+TOKEN = "secret"
+
+
+def busy_work(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+def profiled_app(directory: str, sample_rate: float = 0.0, token: str = TOKEN) -> ProfilingMiddleware:
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        busy_work(0.05)
+        return {"ok": True}
+
+    return ProfilingMiddleware(app, store=ProfileStore(directory, keep=3), token=token,
+                               sample_rate=sample_rate, interval=0.001)
+
+
+def test_sampler_sees_target_thread():
+    """Samples come from the profiled thread's stack"""
+    sampler = StackSampler(threading.get_ident(), 0.001)
+    sampler.start()
+    busy_work(0.05)
+    samples = sampler.stop()
+    assert sum(samples.values()) > 5
+    assert any("busy_work" in stack for stack in samples)
+
+
+def test_token_header_triggers_profile():
+    """Only requests with the right token produce a collapsed-stack file"""
+    with tempfile.TemporaryDirectory() as directory:
+        app = profiled_app(directory)
+        asyncio.run(asgi_request(app, "GET", "/slow"))
+        asyncio.run(asgi_request(app, "GET", "/slow", headers=[(b"x-profile-token", b"wrong")]))
+        assert ProfileStore(directory).list() == []
+
+        status, _, _ = asyncio.run(asgi_request(app, "GET", "/slow", headers=[(b"x-profile-token", TOKEN.encode())]))
+        assert status == 200
+        profiles = ProfileStore(directory).list()
+        assert len(profiles) == 1
+        with open(os.path.join(directory, profiles[0]["name"])) as f:
+            lines = f.read().splitlines()
+        assert any("busy_work" in line for line in lines)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_sample_rate_and_rotation():
+    """A full sample rate profiles everything and only the newest `keep` files remain"""
+    with tempfile.TemporaryDirectory() as directory:
+        app = profiled_app(directory, sample_rate=1.0)
+        for _ in range(5):
+            asyncio.run(asgi_request(app, "GET", "/slow"))
+        store = ProfileStore(directory, keep=3)
+        assert len(store.list()) == 3
+        assert store.path_for("../config.py") is None
+        assert store.path_for(store.list()[0]["name"]) is not None
+
+
+def test_sampling_needs_a_token(app_env):
+    """Without PROFILE_TOKEN nothing is sampled, since /profiles could never serve it"""
+    from fastapi import HTTPException
+    import main
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(asgi_request(profiled_app(directory, sample_rate=1.0, token=""), "GET", "/slow"))
+        assert ProfileStore(directory).list() == []
+    app_env.set(PROFILE_TOKEN="", PROFILE_SAMPLE_RATE=1.0)
+    assert not main.settings.profiling_enabled()
+    app_env.set(PROFILE_TOKEN=TOKEN)
+    main.check_profile_access(TOKEN)
+    for wrong in [None, "wrong", "é"]:
+        with pytest.raises(HTTPException) as e:
+            main.check_profile_access(wrong)
+        assert e.value.status_code == 403
+
+
+def test_chat_profile_includes_worker_threads(app_env):
+    """A profiled /chat request samples the agent's worker and LLM threads, not just the event loop"""
+    import json
+
+    import main
+    from agent import AnshulChatAgent
+    from fake_model import FakeGenerativeModel, constant_latency
+
+    app_env.use_agent(AnshulChatAgent(model=FakeGenerativeModel(latency=constant_latency(0.05))))
+    with tempfile.TemporaryDirectory() as directory:
+        app = ProfilingMiddleware(main.app, store=ProfileStore(directory), token=TOKEN, interval=0.001)
+        body = json.dumps({"message": "Hi", "session_id": "profile-test"}).encode()
+        status, _, _ = asyncio.run(asgi_request(app, "POST", "/chat", body=body,
+                                                headers=[(b"x-profile-token", TOKEN.encode())]))
+        assert status == 200
+        with open(os.path.join(directory, ProfileStore(directory).list()[0]["name"])) as f:
+            stacks = f.read()
+    assert "(agent.py:" in stacks
+    assert "_send (agent.py:" in stacks
+    assert "send_message (fake_model.py:" in stacks
+    assert any(line.startswith("llm") for line in stacks.splitlines())
+
+
+if __name__ == "__main__":
+    print("🧪 Testing request profiler...")
+    raise SystemExit(pytest.main(["-q", __file__]))
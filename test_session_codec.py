@@ -0,0 +1,100 @@
+"""
+Round-trip property tests for the binary session codec
+Randomized with fixed seeds; run with pytest or directly: python test_session_codec.py
+"""
+import random
+
+from profile_data import SYSTEM_PROMPT
+from session_codec import decode, encode_delta, encode_snapshot, replay_frames, zstandard
+
+ROLES = ["user", "assistant", "model", "system", "tool"]
+ALPHABET = "abc xyz 0123456789 .,!?\n\t\"'\\ é ü ß ñ 中文 日本語 🚀 🤖 ✅ ​ \x00"
+COMPRESSIONS = ["none", "zlib", "auto"] + (["zstd"] if zstandard is not None else [])
+
+
+def random_text(rng: random.Random) -> str:
+    length = rng.choice([0, 1, 5, 50, 300, 5000])
+    return "".join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def random_messages(rng: random.Random, count: int):
+    return [{"role": rng.choice(ROLES), "content": random_text(rng)} for _ in range(count)]
+
+
+def test_snapshot_round_trip():
+    """decode(encode(x)) == x for random sessions under every compression mode"""
+    rng = random.Random(1234)
+    for _ in range(300):
+        messages = random_messages(rng, rng.randint(0, 15))
+        for compression in COMPRESSIONS:
+            assert decode(encode_snapshot(messages, compression)) == messages
+
+
+def test_delta_round_trip_with_trimming():
+    """Deltas replay to the same state as the agent's append-and-trim session updates"""
+    rng = random.Random(99)
+    for _ in range(50):
+        limit = rng.randint(2, 10)
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        frames = [encode_snapshot(messages)]
+        for _ in range(rng.randint(1, 20)):
+            previous = messages
+            messages = previous + [
+                {"role": "user", "content": random_text(rng)},
+                {"role": "assistant", "content": random_text(rng)},
+            ]
+            if len(messages) > limit + 1:
+                messages = [messages[0]] + messages[-limit:]
+            frames.append(encode_delta(previous, messages, rng.choice(COMPRESSIONS)))
+            assert decode(frames[-1], previous) == messages
+        assert replay_frames(frames) == messages
+
+
+def test_delta_is_small_and_falls_back():
+    """A turn's delta carries only the new messages; unrelated states become snapshots"""
+    old = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": "hi"}]
+    new = old + [{"role": "assistant", "content": "hello"}]
+    delta = encode_delta(old, new, "none")
+    assert len(delta) < 20
+    assert decode(delta, old) == new
+
+    unrelated = [{"role": "user", "content": "something else"}]
+    frame = encode_delta(old, unrelated)
+    assert decode(frame) == unrelated
+
+
+def test_rejects_bad_input():
+    """Corrupt frames and mismatched delta bases raise ValueError"""
+    old = [{"role": "user", "content": "a"}]
+    new = old + [{"role": "assistant", "content": "b"}]
+    delta = encode_delta(old, new)
+    snapshot = encode_snapshot(new, "none")
+    for bad, base in [(b"", None), (b"junk", None), (snapshot[:-1], None), (snapshot + b"\x00", None),
+                      (delta, None), (delta, new)]:
+        try:
+            decode(bad, base)
+            raise AssertionError(f"expected ValueError for {bad!r}")
+        except ValueError:
+            pass
+    # Same length as the real base but different content
+    other = [{"role": "user", "content": "z"}]
+    for base in (other, [{"role": "assistant", "content": "a"}]):
+        try:
+            decode(delta, base)
+            raise AssertionError("expected ValueError for a same-length wrong base")
+        except ValueError:
+            pass
+    try:
+        encode_snapshot([{"role": "user", "content": "x", "extra": 1}])
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+
+
+if __name__ == "__main__":
+    print("🧪 Testing session codec...")
+    for test in [test_snapshot_round_trip, test_delta_round_trip_with_trimming, test_delta_is_small_and_falls_back,
+                 test_rejects_bad_input]:
+        test()
+        print(f"   ✅ {test.__name__}")
+    print("\n🎉 All session codec tests passed!")
@@ -0,0 +1,172 @@
+"""
+Tests for multi-tenant profile serving
+Run with pytest or directly: python test_tenants.py
+"""
+import asyncio
+import json
+import os
+import tempfile
+
+import pytest
+
+from profile_data import ANSHUL_PROFILE
+from replay import asgi_request
+from tenants import TenantNotFound, TenantRegistry, default_tenant
+
+
+def write_tenant(directory: str, tenant_id: str, name: str, extension: str = ".json"):
+    data = ANSHUL_PROFILE.model_dump(mode="json")
+    data["contact"]["name"] = name
+    path = os.path.join(directory, tenant_id + extension)
+    with open(path, "w") as f:
+        if extension == ".json":
+            json.dump(data, f)
+        else:
+            import yaml
+            yaml.safe_dump(data, f)
+    return path
+
+
+def test_lazy_load_and_render():
+    """A tenant file is read on first use and its prompt and context are rendered for it"""
+    with tempfile.TemporaryDirectory() as directory:
+        write_tenant(directory, "jane", "Jane Doe")
+        registry = TenantRegistry(directory)
+        assert registry.stats()["cached"] == 0
+
+        tenant = registry.get("jane")
+        assert tenant.profile.contact.name == "Jane Doe"
+        assert "representing Jane Doe" in tenant.system_prompt
+        assert "Jane's profile" in tenant.system_prompt
+        assert tenant.get_context("projects").startswith("Projects:")
+        assert registry.get("jane") is tenant
+        assert registry.stats()["hits"] == 1
+
+
+def test_yaml_unknown_and_invalid_tenants():
+    """YAML files load, unknown IDs raise TenantNotFound, bad files raise ValueError"""
+    with tempfile.TemporaryDirectory() as directory:
+        write_tenant(directory, "yam", "Yam Lee", ".yaml")
+        with open(os.path.join(directory, "broken.json"), "w") as f:
+            json.dump({"summary": "missing everything else"}, f)
+        with open(os.path.join(directory, "mangled.yaml"), "w") as f:
+            f.write("contact: [unclosed\n")
+        registry = TenantRegistry(directory)
+
+        assert registry.get("yam").profile.contact.name == "Yam Lee"
+        assert registry.get(None) is default_tenant()
+        for bad_id in ["nobody", "../etc/passwd"]:
+            try:
+                registry.get(bad_id)
+                raise AssertionError("expected TenantNotFound")
+            except TenantNotFound:
+                pass
+        for bad_file in ["broken", "mangled"]:
+            try:
+                registry.get(bad_file)
+                raise AssertionError("expected ValueError")
+            except ValueError:
+                pass
+
+
+def test_contact_fields_are_required():
+    """A tenant file missing a contact field is rejected rather than filled with the built-in details"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_tenant(directory, "jane", "Jane Roe")
+        with open(path) as f:
+            data = json.load(f)
+        del data["contact"]["email"]
+        with open(path, "w") as f:
+            json.dump(data, f)
+        try:
+            TenantRegistry(directory).get("jane")
+            raise AssertionError("expected ValueError")
+        except ValueError as e:
+            assert "email" in str(e)
+            assert ANSHUL_PROFILE.contact.email not in str(e)
+
+
+def test_lru_memory_cap():
+    """Least recently used tenants are evicted once the byte cap is exceeded"""
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(10):
+            write_tenant(directory, f"t{i}", f"Tenant {i}")
+        one = TenantRegistry(directory).get("t0").size_bytes
+        registry = TenantRegistry(directory, max_bytes=one * 3)
+
+        for i in range(10):
+            registry.get(f"t{i}")
+        stats = registry.stats()
+        assert stats["cached"] == 3
+        assert stats["evictions"] == 7
+        assert stats["cached_bytes"] <= registry.max_bytes
+
+
+def test_endpoints_route_by_tenant_header(app_env):
+    """X-Tenant-Id selects the profile; unknown tenants get 404"""
+    import main
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_tenant(directory, "jane", "Jane Doe")
+        app_env.set(TENANT_DIR=directory)
+        status, _, body = asyncio.run(asgi_request(main.app, "GET", "/profile", headers=[(b"x-tenant-id", b"jane")]))
+        assert status == 200
+        assert json.loads(body)["profile"]["contact"]["name"] == "Jane Doe"
+
+        status, _, body = asyncio.run(asgi_request(main.app, "GET", "/profile"))
+        assert json.loads(body)["profile"]["contact"]["name"] == ANSHUL_PROFILE.contact.name
+
+        status, _, _ = asyncio.run(asgi_request(main.app, "GET", "/profile", headers=[(b"x-tenant-id", b"ghost")]))
+        assert status == 404
+
+
+def test_journal_records_tenant(app_env):
+    """Journaled turns say which tenant they belong to"""
+    import main
+    from journal import ConversationJournal, read_journal
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_tenant(directory, "jane", "Jane Doe")
+        journal = ConversationJournal(directory=os.path.join(directory, "journal"))
+        app_env.use_agent()
+        app_env.monkeypatch.setattr(main, "get_journal", lambda: journal)
+        app_env.set(JOURNAL_ENABLED=True, TENANT_DIR=directory)
+        journal.start()
+        try:
+            body = json.dumps({"message": "Hi", "session_id": "journal-tenant"}).encode()
+            for headers in ([(b"x-tenant-id", b"jane")], None):
+                status, _, _ = asyncio.run(asgi_request(main.app, "POST", "/chat", body=body, headers=headers))
+                assert status == 200
+        finally:
+            journal.close()
+        entries = list(read_journal(os.path.join(directory, "journal")))
+        assert [(e["session_id"], e["tenant_id"]) for e in entries] == [
+            ("journal-tenant", "jane"), ("journal-tenant", main.settings.DEFAULT_TENANT_ID)]
+
+
+def test_sessions_stay_within_tenant(app_env):
+    """A session ID cannot name another tenant's session, and /sessions only lists the caller's"""
+    import main
+
+    jane = [(b"x-tenant-id", b"jane")]
+    with tempfile.TemporaryDirectory() as directory:
+        write_tenant(directory, "jane", "Jane Doe")
+        app_env.use_agent()
+        app_env.set(TENANT_DIR=directory)
+        for session_id, headers in (("v1", jane), ("jane:v1", None)):
+            body = json.dumps({"message": "Hi", "session_id": session_id}).encode()
+            status, _, body = asyncio.run(asgi_request(main.app, "POST", "/chat", body=body, headers=headers))
+            assert status == 200
+            assert json.loads(body)["message_count"] == 2
+
+        status, _, _ = asyncio.run(asgi_request(main.app, "POST", "/reset", query="session_id=jane:v1"))
+        assert status == 200
+        status, _, body = asyncio.run(asgi_request(main.app, "GET", "/sessions", headers=jane))
+        assert [s["session_id"] for s in json.loads(body)["sessions"]] == ["v1"]
+        status, _, body = asyncio.run(asgi_request(main.app, "GET", "/sessions"))
+        assert json.loads(body)["sessions"] == []
+
+
+if __name__ == "__main__":
+    print("🧪 Testing multi-tenant profiles...")
+    raise SystemExit(pytest.main(["-q", __file__]))
@@ -0,0 +1,107 @@
+"""
+Opt-in traffic capture for deterministic replay
+Records anonymized request sequences with their timing through the write-behind journal
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import Request
+
+from config import settings
+from journal import ConversationJournal
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+NUMBER_PATTERN = re.compile(r"\+?\d[\d\s-]{6,}\d")
+
+
+class TrafficRecorder:
+    """
+    Captures every request as {ts, method, path, query, body, status, latency_ms, client},
+    plus the X-Tenant-Id header as "tenant" when present
+    - Session IDs and client addresses are replaced by salted hashes (stable within one capture)
+    - Emails and phone-like numbers in messages are masked
+    """
+
+    def __init__(self, directory: Optional[str] = None, salt: Optional[str] = None,
+                 client_key: Optional[Callable[[Request], str]] = None):
+        """
+        Args:
+            client_key: How the app identifies a caller for rate limits and the fair queue
+                        (default: the socket peer address)
+        """
+        self.journal = ConversationJournal(directory=directory or settings.CAPTURE_DIR)
+        self.salt = salt or settings.CAPTURE_SALT or os.urandom(8).hex()
+        self.client_key = client_key or (lambda request: request.client.host if request.client else "unknown")
+
+    def _digest(self, value: str) -> str:
+        return hashlib.sha256(f"{self.salt}:{value}".encode("utf-8")).hexdigest()[:12]
+
+    def anonymize_session(self, session_id: str) -> str:
+        return f"anon-{self._digest(session_id)}"
+
+    def anonymize_client(self, client: str) -> str:
+        return f"client-{self._digest('client:' + client)}"
+
+    @staticmethod
+    def anonymize_text(text: str) -> str:
+        text = EMAIL_PATTERN.sub("<email>", text)
+        return NUMBER_PATTERN.sub("<number>", text)
+
+    def anonymize_body(self, body: bytes) -> Optional[Dict]:
+        if not body:
+            return None
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+        if "session_id" in data and isinstance(data["session_id"], str):
+            data["session_id"] = self.anonymize_session(data["session_id"])
+        if "message" in data and isinstance(data["message"], str):
+            data["message"] = self.anonymize_text(data["message"])
+        return data
+
+    def anonymize_query(self, query: str) -> str:
+        if not query:
+            return ""
+        pairs = [
+            (key, self.anonymize_session(value) if key == "session_id" else value)
+            for key, value in parse_qsl(query, keep_blank_values=True)
+        ]
+        return urlencode(pairs)
+
+    async def middleware(self, request: Request, call_next):
+        """HTTP middleware: time the request and queue an anonymized record"""
+        body = await request.body()
+        ts = time.time()
+        start = time.perf_counter()
+        response = await call_next(request)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        entry = {
+            "ts": ts,
+            "method": request.method,
+            "path": request.url.path,
+            "query": self.anonymize_query(request.url.query),
+            "body": self.anonymize_body(body),
+            "status": response.status_code,
+            "latency_ms": round(latency_ms, 3),
+            "client": self.anonymize_client(self.client_key(request)),
+        }
+        tenant = request.headers.get(settings.TENANT_HEADER)
+        if tenant:
+            entry["tenant"] = tenant
+        self.journal.append(entry)
+        return response
+
+    def start(self):
+        self.journal.start()
+
+    def close(self):
+        self.journal.close()